@@ -9,6 +9,8 @@ import v4pub
 
 # FABRIC site to allocate slice; must pick a site with IPv6 management address
 SITE = 'STAR'
+# whether to run an APT caching proxy for WireGuard clients, reachable via FABNetv4 on port 3142
+WANT_APT_PROXY = False
 
 # no need to change anything below
 
@@ -60,13 +62,15 @@ node.execute(f'''
     sudo hostnamectl set-hostname v4gateway
     sudo DEBIAN_FRONTEND=noninteractive apt update
     sudo DEBIAN_FRONTEND=noninteractive apt full-upgrade -y -qq
-    sudo DEBIAN_FRONTEND=noninteractive apt install -y -qq httpie iperf3 jq mtr-tiny traceroute wireguard
+    sudo DEBIAN_FRONTEND=noninteractive apt install -y -qq httpie iperf3 jq mtr-tiny traceroute wireguard {'apt-cacher-ng' if WANT_APT_PROXY else ''}
     sudo DEBIAN_FRONTEND=noninteractive apt purge -y nano
     sudo ufw allow to {node.get_management_ip()} port 22 proto tcp
     yes | sudo ufw enable
     echo {shlex.quote(netplan_conf)} | sudo tee /etc/netplan/64-v4gateway.yaml >/dev/null
     sed -e 's/IP-WAN/{ip_wan}/g' -e 's/IP-LAN/{ip_lan}/g' wg0.conf | sudo tee /etc/wireguard/wg0.conf >/dev/null
     sudo ufw allow to {ip_lan} port 51820 proto udp
+    {f"echo 'PassThroughPattern: .*:443$' | sudo tee /etc/apt-cacher-ng/zz-passthrough.conf" if WANT_APT_PROXY else ''}
+    {f"sudo ufw allow from 10.128.0.0/10 to {ip_lan} port 3142 proto tcp" if WANT_APT_PROXY else ''}
     sudo systemctl enable wg-quick@wg0.service
     sudo reboot
 ''')
@@ -74,3 +78,5 @@ node.execute(f'''
 print(node.get_ssh_command())
 print(f'WAN IP {ip_wan}')
 print(f'LAN IP {ip_lan}')
+if WANT_APT_PROXY:
+    print(f'APT proxy {ip_lan}:3142')
@@ -12,6 +12,9 @@ from fabrictestbed_extensions.fablib.slice import Slice
 server_hostname = 'wg-fabric.example.com'
 # WireGuard VPN server public key, see v4gateway-wg0.conf [Interface] section
 server_pubkey = '0YpMUckXCLDbwlKsMQv2MRyZhOhV4Xvd9VBoaJZEoAA='
+# APT caching proxy on WireGuard VPN server, written as LAN IP and port printed by v4gateway.py;
+# empty string to download APT packages through the VPN tunnel
+apt_proxy = ''
 
 # no need to change anything below
 
@@ -84,6 +87,13 @@ def build_netplan_conf(intf: Interface, intf_ip: ipaddress.IPv4Address, net: Net
     })
 
 
+def apt_proxy_cmd() -> str:
+    if apt_proxy == '':
+        return ''
+    proxy_conf = f'Acquire::http::Proxy "http://{apt_proxy}";\nAcquire::https::Proxy "http://{apt_proxy}";'
+    return f'echo {shlex.quote(proxy_conf)} | sudo tee /etc/apt/apt.conf.d/01proxy'
+
+
 def enable_on_network(net: NetworkService, clients: T.List[T.Tuple[str, str]], assoc: T.Dict[str, str]) -> None:
     ip_alloc = net.get_available_ips()
     execute_threads = {}
@@ -100,6 +110,7 @@ def enable_on_network(net: NetworkService, clients: T.List[T.Tuple[str, str]], a
             sudo systemctl restart systemd-resolved
             echo {shlex.quote(netplan_conf)} | sudo tee /etc/netplan/64-v4wg.yaml
             sudo netplan apply
+            {apt_proxy_cmd()}
         ''')
     for thread in execute_threads.values():
         thread.result()
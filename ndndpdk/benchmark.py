@@ -1,4 +1,3 @@
-import json
 import shlex
 import time
 
@@ -7,9 +6,13 @@ from fabrictestbed_extensions.fablib.fablib import \
 from fabrictestbed_extensions.fablib.interface import Interface
 
 import ndndpdk_common
+import ndndpdk_mem
 
-# FABRIC site(s) for forwarder F, trafficgen A, trafficgen B; they may be same or different
-SITE_F, SITE_A, SITE_B = 'STAR', 'SALT', 'CLEM'
+# number of forwarders and trafficgens; trafficgens are assigned to forwarders round-robin,
+# each forwarder needs at least two trafficgens; benchmark webapp requires 1 forwarder and 2 trafficgens
+N_FORWARDERS, N_TRAFFICGENS = 1, 2
+# FABRIC sites for forwarders and trafficgens, will be used successively for each node; they may be same or different
+SITES_F, SITES_T = ['STAR'], ['SALT', 'CLEM']
 # NIC model, 'NIC_Basic' or 'NIC_ConnectX_5' or 'NIC_ConnectX_6'
 NIC_MODEL = 'NIC_Basic'
 # whether trafficgen should have NVMe device to support NDN-DPDK fileserver;
@@ -17,6 +20,10 @@ NIC_MODEL = 'NIC_Basic'
 WANT_FILESERVER = True
 # NDN-DPDK git repository
 NDNDPDK_GIT = ndndpdk_common.DEFAULT_GIT_REPO
+# local directory to cache NDN-DPDK builds across slices, or None to disable
+NDNDPDK_CACHE = None
+# whether to run an APT caching proxy on forwarder node, so that each package is downloaded once per slice
+WANT_APT_PROXY = False
 
 # no need to change anything below
 
@@ -25,167 +32,231 @@ slice_name = f'ndndpdk-benchmark@{int(time.time())}'
 print(slice_name)
 
 slice = fablib.new_slice(name=slice_name)
-nodeF = slice.add_node(name='NF', site=SITE_F, cores=24,
-                       ram=32, disk=100, image='default_ubuntu_24')
-intfsF = nodeF.add_component(model=NIC_MODEL, name='nic0').get_interfaces()
-if len(intfsF) < 2:
-    intfsF += nodeF.add_component(model=NIC_MODEL,
-                                  name='nic1').get_interfaces()
-nodeA = slice.add_node(name='NA', site=SITE_A, cores=12,
-                       ram=32, disk=100, image='default_ubuntu_24')
-intfsA = nodeA.add_component(model=NIC_MODEL, name='nic0').get_interfaces()
-nodeB = slice.add_node(name='NB', site=SITE_B, cores=12,
-                       ram=32, disk=100, image='default_ubuntu_24')
-intfsB = nodeB.add_component(model=NIC_MODEL, name='nic0').get_interfaces()
-slice.add_l2network(name='netA', interfaces=[intfsF[0], intfsA[0]],
-                    type=('L2Bridge' if SITE_F == SITE_A else 'L2STS' if NIC_MODEL == 'NIC_Basic' else 'L2PTP'))
-slice.add_l2network(name='netB', interfaces=[intfsF[1], intfsB[0]],
-                    type=('L2Bridge' if SITE_F == SITE_B else 'L2STS' if NIC_MODEL == 'NIC_Basic' else 'L2PTP'))
-if WANT_FILESERVER:
-    nodeA.add_component(model='NVME_P4510', name='disk')
-    nodeB.add_component(model='NVME_P4510', name='disk')
+topology = ndndpdk_common.benchmark_topology(N_FORWARDERS, N_TRAFFICGENS)
+fw_of = {tg: fw for fw, tgs in topology.items() for tg in tgs}
+for i, (fw, tgs) in enumerate(topology.items()):
+    # one NIC port per trafficgen
+    node = slice.add_node(name=f'N{fw}', site=SITES_F[i % len(SITES_F)], cores=24,
+                          ram=32, disk=100, image='default_ubuntu_24')
+    intfs = []
+    while len(intfs) < len(tgs):
+        intfs += node.add_component(model=NIC_MODEL,
+                                    name=f'nic{len(node.get_components())}').get_interfaces()
+    for tg, intfF in zip(tgs, intfs):
+        siteT = SITES_T[ndndpdk_common.TRAFFICGEN_IDS.index(tg) % len(SITES_T)]
+        nodeT = slice.add_node(name=f'N{tg}', site=siteT, cores=12,
+                               ram=32, disk=100, image='default_ubuntu_24')
+        intfT = nodeT.add_component(
+            model=NIC_MODEL, name='nic0').get_interfaces()[0]
+        slice.add_l2network(name=f'net{tg}', interfaces=[intfF, intfT],
+                            type=ndndpdk_common.l2network_type(node.get_site(), siteT, NIC_MODEL))
+        if WANT_FILESERVER:
+            nodeT.add_component(model='NVME_P4510', name='disk')
+    del node, intfs
 for node in slice.get_nodes():
     node.add_fabnet()
 slice.submit()
-del intfsF, intfsA, intfsB
 
 ctrl_addrs = {node.get_name(): node.get_interface(
     network_name=f'FABNET_IPv4_{node.get_site()}').get_ip_addr() for node in slice.get_nodes()}
+# forwarder F builds NDN-DPDK, serves APT proxy, and runs benchmark webapp
 nodeF = slice.get_node(name='NF')
-nodeA = slice.get_node(name='NA')
-nodeB = slice.get_node(name='NB')
-intfFA = nodeF.get_interface(network_name='netA')
-intfFB = nodeF.get_interface(network_name='netB')
-intfAF = nodeA.get_interface(network_name='netA')
-intfBF = nodeB.get_interface(network_name='netB')
 
 fs_path = '/srv/fileserver'
-fs_nodes = [nodeA, nodeB] if WANT_FILESERVER else []
-for node in fs_nodes:
-    node.get_component('disk').configure_nvme(mount_point=fs_path)
+fw_names = [f'N{fw}' for fw in topology]
+fs_names = [f'N{tg}' for tg in fw_of] if WANT_FILESERVER else []
+others = [node for node in slice.get_nodes() if node.get_name() != 'NF']
+apt_proxy = f"{ctrl_addrs['NF']}:{ndndpdk_common.APT_PROXY_PORT}" if WANT_APT_PROXY else None
+build_key = None
 
-# install necessary packages
-execute_threads = {}
-for node in slice.get_nodes():
-    print(
-        f'{node.get_name()} {ctrl_addrs[node.get_name()]} {node.get_management_ip()}')
-    execute_threads[node] = node.execute_thread(f'''
+
+def port_pci(node) -> list[str]:
+    # PCI addresses of dataplane NIC ports
+    facts = ndndpdk_common.get_facts(node)
+    id = node.get_name()[1:]
+    return [facts.pci_vlan(mac=node.get_interface(network_name=f'net{tg}').get_mac())[0]
+            for tg in topology.get(id, [id])]
+
+
+def hugepages_cmd(node) -> str:
+    # hugepages are sized for the same mempools as benchrun.py activation parameters,
+    # and reserved on the NUMA node of NIC ports, which becomes *_NUMA_PRIMARY in .env;
+    # unknown NUMA node means the guest has only NUMA node 0
+    numa = ndndpdk_common.get_facts(node).ports_numa(port_pci(node))
+    mempool = ndndpdk_mem.BENCHMARK_FW_MEMPOOL if node.get_name() in fw_names else ndndpdk_mem.BENCHMARK_TG_MEMPOOL
+    return ndndpdk_common.hugepages_boot_cmd(ndndpdk_mem.plan_memory({'mempool': mempool}, numa=max(0, numa)))
+
+
+def cpuset_cmd(node) -> str:
+    # set CPU isolation, pin host CPU if using SmartNIC
+    instance = f'{ctrl_addrs[node.get_name()]}:3030'
+    return ndndpdk_common.cpuset_cmd(node, instances={instance: node.get_cores()-4}, pin_cpu={instance: None if NIC_MODEL == 'NIC_Basic' else 'nic0'})
+
+
+def step_apt_proxy(node) -> None:
+    node.execute(ndndpdk_common.apt_proxy_cmd(), quiet=True)
+
+
+def step_install(node) -> None:
+    # install necessary packages; CPU isolation and hugepages are configured now on nodes other than the builder,
+    # so that a single reboot applies all
+    if node.get_name() in fs_names:
+        node.get_component('disk').configure_nvme(mount_point=fs_path)
+    node.execute(f'''
         echo 'set enable-bracketed-paste off' | sudo tee -a /etc/inputrc
         sudo hostnamectl set-hostname {shlex.quote(node.get_name())}
-        {ndndpdk_common.apt_install_cmd()}
+        {ndndpdk_common.apt_install_cmd(apt_proxy=apt_proxy)}
         sudo loginctl enable-linger {shlex.quote(node.get_username())}
-        sudo systemctl reboot
-    ''')
-for thread in execute_threads.values():
-    thread.result()
-slice.wait_ssh(progress=True)
-slice.post_boot_config()
-
-# build and install NDN-DPDK, set CPU isolation, pin host CPU if using SmartNIC
-execute_threads = {}
-for node in slice.get_nodes():
-    instance = f'{ctrl_addrs[node.get_name()]}:3030'
-    execute_threads[node] = node.execute_thread(f'''
-        {ndndpdk_common.dl_build_cmd(repo=NDNDPDK_GIT)}
-        {ndndpdk_common.cpuset_cmd(node, instances={instance: node.get_cores()-4}, pin_cpu={instance: None if NIC_MODEL == 'NIC_Basic' else 'nic0'})}
-        sudo systemctl reboot
-    ''')
-for thread in execute_threads.values():
-    thread.result()
-slice.wait_ssh(progress=True)
-slice.post_boot_config()
-
-# mount NVMe device and populate files for fileserver benchmark
-for node in fs_nodes:
+        {'' if node.get_name() == 'NF' else cpuset_cmd(node)}
+        {'' if node.get_name() == 'NF' else hugepages_cmd(node)}
+    ''', quiet=True)
+
+
+def step_build(node) -> None:
+    # build NDN-DPDK once and serve it to other nodes
+    global build_key
+    build_key = ndndpdk_common.build_artifact(
+        node, repo=NDNDPDK_GIT, cache_dir=NDNDPDK_CACHE)
+    node.execute(ndndpdk_common.serve_artifact_cmd(
+        ctrl_addrs[node.get_name()]), quiet=True)
+
+
+def step_ndndpdk(node) -> None:
+    ndndpdk_common.install_remote_artifact(
+        node, ctrl_addrs['NF'], build_key)
+
+
+def step_cpuset(node) -> None:
+    # CPU isolation and hugepages on the forwarder are configured after the build, so that compilation can use all cores
+    node.execute(f'''
+        {ndndpdk_common.serve_artifact_stop_cmd()}
+        {cpuset_cmd(node)}
+        {hugepages_cmd(node)}
+    ''', quiet=True)
+
+
+def step_fileserver(node) -> None:
+    # mount NVMe device and populate files for fileserver benchmark
     node.execute(f'''
-        echo {node.get_name()}
         sudo mkdir -p {shlex.quote(fs_path)}
         sudo mount /dev/nvme0n1p1 {shlex.quote(fs_path)}
         sudo chown {node.get_username()} {shlex.quote(fs_path)}
         cd ~/ndn-dpdk/sample/benchmark
         bash ./prepare-fileserver.sh {shlex.quote(fs_path)}
-    ''')
+    ''', quiet=True)
 
-# start NDN-DPDK services
-for node in slice.get_nodes():
+
+def step_start(node) -> None:
+    # start NDN-DPDK service
     node.execute(f'''
-        echo {node.get_name()}
         sudo mkdir -p /run/ndn
-        {ndndpdk_common.hugepages_cmd(size=20)}
+        dpdk-hugepages.py --show
         sudo ndndpdk-ctrl --gqlserver=http://{ctrl_addrs[node.get_name()]}:3030 systemd start
-    ''')
+    ''', quiet=True)
 
-# gather information and prepare .env
-benchmark_env = {}
-for node in slice.get_nodes():
-    id = node.get_name()[1]
-    benchmark_env[f'{id}_GQLSERVER'] = f'http://{ctrl_addrs[node.get_name()]}:3030'
-    benchmark_env[f'{id}_NUMA_PRIMARY'] = 0
-    benchmark_env[f'{id}_CORES_PRIMARY'] = ','.join(
-        [str(x) for x in range(6, node.get_cores())])
-    benchmark_env[f'{id}_CORES_SECONDARY'] = '4,5'
-    if id != 'F':
-        benchmark_env[f'{id}_FILESERVER_PATH'] = fs_path
+
+def step_facts(node) -> None:
+    # facts cached by hugepages_cmd() predate the reboot and the cpuset drop-in
+    ndndpdk_common.get_facts(node, refresh=True)
 
 
-iplinks = {}
 for node in slice.get_nodes():
-    iplinks[node.get_name()] = json.loads(
-        node.execute('ip -j -d link', quiet=True)[0])
+    print(
+        f'{node.get_name()} {ctrl_addrs[node.get_name()]} {node.get_management_ip()}')
 
+provision = ndndpdk_common.Provision()
+if WANT_APT_PROXY:
+    provision.add(nodeF, 'apt-proxy', step_apt_proxy)
+for node in slice.get_nodes():
+    provision.add(node, 'install', step_install,
+                  after=[('NF', 'apt-proxy')] if WANT_APT_PROXY else [])
+# forwarder node may be serving as APT proxy, so it reboots after other nodes finish installing packages
+provision.add(nodeF, 'reboot', ndndpdk_common.reboot, after=['install'] + (
+    [(node.get_name(), 'install') for node in others] if WANT_APT_PROXY else []))
+provision.add(nodeF, 'build', step_build, after=['reboot'])
+provision.add(nodeF, 'cpuset', step_cpuset, after=['build'] + [
+    (node.get_name(), 'ndndpdk') for node in others])
+provision.add(nodeF, 'reboot-cpuset', ndndpdk_common.reboot, after=['cpuset'])
+provision.add(nodeF, 'start', step_start, after=['reboot-cpuset'])
+provision.add(nodeF, 'facts', step_facts, after=['reboot-cpuset'])
+for node in others:
+    provision.add(node, 'reboot', ndndpdk_common.reboot, after=['install'])
+    provision.add(node, 'ndndpdk', step_ndndpdk,
+                  after=['reboot', ('NF', 'build')])
+    if node.get_name() in fs_names:
+        provision.add(node, 'fileserver', step_fileserver, after=['ndndpdk'])
+    provision.add(node, 'start', step_start, after=['ndndpdk'])
+    provision.add(node, 'facts', step_facts, after=['reboot'])
+provision.run()
 
-def extract_pci_vlan(node: str, ifname: str) -> tuple[str, int, str]:
-    link = [link for link in iplinks[node]
-            if link['ifname'] == ifname]
-    if len(link) != 1:
-        raise f'netif {intf} not found on {node} `ip link` output'
-    link = link[0]
-    try:
-        if link['linkinfo']['info_kind'] == 'vlan' and link['linkinfo']['info_data']['protocol'] == '802.1Q':
-            pci, vlan, addr = extract_pci_vlan(node, link['link'])
-            return pci, link['linkinfo']['info_data']['id'], link['address']
-    except KeyError:
-        pass
-    return link['parentdev'].replace('0000:', ''), 0, link['address']
+# gather information and prepare .env
+facts = ndndpdk_common.collect_facts(slice.get_nodes())
 
 
 def get_pci_vlan(intf: Interface) -> tuple[str, int, str]:
-    return extract_pci_vlan(intf.get_node().get_name(), intf.get_device_name())
+    return facts[intf.get_node().get_name()].pci_vlan(mac=intf.get_mac())
 
 
-benchmark_env['F_PORT_A'], benchmark_env['F_VLAN_A'], benchmark_env['F_HWADDR_A'] = get_pci_vlan(
-    intfFA)
-benchmark_env['F_PORT_B'], benchmark_env['F_VLAN_B'], benchmark_env['F_HWADDR_B'] = get_pci_vlan(
-    intfFB)
-benchmark_env['A_PORT_F'], benchmark_env['A_VLAN_F'], benchmark_env['A_HWADDR_F'] = get_pci_vlan(
-    intfAF)
-benchmark_env['B_PORT_F'], benchmark_env['B_VLAN_F'], benchmark_env['B_HWADDR_F'] = get_pci_vlan(
-    intfBF)
+benchmark_env = {}
+benchmark_env['FORWARDERS'] = ','.join(topology)
+for fw, tgs in topology.items():
+    benchmark_env[f'{fw}_TRAFFICGENS'] = ','.join(tgs)
+    for tg in tgs:
+        benchmark_env[f'{fw}_PORT_{tg}'], benchmark_env[f'{fw}_VLAN_{tg}'], benchmark_env[f'{fw}_HWADDR_{tg}'] = get_pci_vlan(
+            slice.get_node(name=f'N{fw}').get_interface(network_name=f'net{tg}'))
+        benchmark_env[f'{tg}_PORT_{fw}'], benchmark_env[f'{tg}_VLAN_{fw}'], benchmark_env[f'{tg}_HWADDR_{fw}'] = get_pci_vlan(
+            slice.get_node(name=f'N{tg}').get_interface(network_name=f'net{tg}'))
+for node in slice.get_nodes():
+    id = node.get_name()[1:]
+    benchmark_env[f'{id}_GQLSERVER'] = f'http://{ctrl_addrs[node.get_name()]}:3030'
+    # cores are selected within the cpuset of NDN-DPDK service, on the NUMA node of its NIC ports
+    numa, primary, secondary = facts[node.get_name()].benchmark_cores(
+        f'{ctrl_addrs[node.get_name()]}:3030',
+        pci=[value for key, value in benchmark_env.items() if key.startswith(f'{id}_PORT_')])
+    benchmark_env[f'{id}_NUMA_PRIMARY'] = numa
+    benchmark_env[f'{id}_CORES_PRIMARY'] = ','.join(
+        [str(x) for x in primary])
+    benchmark_env[f'{id}_CORES_SECONDARY'] = ','.join(
+        [str(x) for x in secondary])
+    if node.get_name() not in fw_names:
+        benchmark_env[f'{id}_FILESERVER_PATH'] = fs_path
+    print(f'{node.get_name()} NUMA_PRIMARY={numa} CORES_PRIMARY={benchmark_env[f"{id}_CORES_PRIMARY"]} '
+          f'CORES_SECONDARY={benchmark_env[f"{id}_CORES_SECONDARY"]}')
 
-# upload .env and start webapps
+# upload .env and headless runner, start webapps
+for filename in ['benchrun.py', 'ndndpdk_gql.py', 'ndndpdk_mem.py', 'perfcap.py', 'telemetry.py']:
+    nodeF.upload_file(filename, filename)
 benchmark_dotenv = '\n'.join(
     [f'{key}={value}' for key, value in benchmark_env.items()])
+# benchmark webapp only understands one forwarder with trafficgens A and B
+want_webapp = topology == {'F': ['A', 'B']}
+# status page port is 8000 plus letter position, so that forwarder F is 8006; other forwarders start from 8101
+status_ports = {id: 8000 + ord(id[0]) - ord('A') + 1 if len(id) == 1 else 8100 + int(id[1:])
+                for id in list(topology) + list(fw_of)}
+status_cmds = '\n'.join([
+    f"systemd-run --user --collect --unit=ndndpdk-status-{id} --same-dir -- corepack pnpm start --listen 127.0.0.1:{port} --gqlserver http://{ctrl_addrs[f'N{id}']}:3030"
+    for id, port in status_ports.items()])
 nodeF.execute(f'''
     cd ~/ndn-dpdk/sample/benchmark
     corepack pnpm -s install
     echo {shlex.quote(benchmark_dotenv)} | tee .env
-    systemd-run --user --collect --unit=ndndpdk-benchmark --same-dir -- corepack pnpm serve
+    {'systemd-run --user --collect --unit=ndndpdk-benchmark --same-dir -- corepack pnpm serve' if want_webapp else ''}
 
     cd ~/ndn-dpdk/sample/status
     corepack pnpm -s install
-    systemd-run --user --collect --unit=ndndpdk-status-F --same-dir -- corepack pnpm start --listen 127.0.0.1:8006 --gqlserver http://{ctrl_addrs['NF']}:3030
-    systemd-run --user --collect --unit=ndndpdk-status-A --same-dir -- corepack pnpm start --listen 127.0.0.1:8001 --gqlserver http://{ctrl_addrs['NA']}:3030
-    systemd-run --user --collect --unit=ndndpdk-status-B --same-dir -- corepack pnpm start --listen 127.0.0.1:8002 --gqlserver http://{ctrl_addrs['NB']}:3030
+    {status_cmds}
 ''')
 
+tunnels = ([3333] if want_webapp else []) + list(status_ports.values())
+pages = (['http://localhost:3333 - benchmark webapp'] if want_webapp else []) + [
+    f"http://localhost:{port} - {'forwarder' if id in topology else 'trafficgen'} {id} status" for id, port in status_ports.items()]
 print(f'''
 ----------------------------------------------------------------
 NDN-DPDK benchmark is ready.
 Open an SSH tunnel:
-{nodeF.get_ssh_command().replace('ssh ', 'ssh -L3333:127.0.0.1:3333 -L8006:127.0.0.1:8006 -L8001:127.0.0.1:8001 -L8002:127.0.0.1:8002 ')}
+{nodeF.get_ssh_command().replace('ssh ', 'ssh ' + ''.join([f'-L{port}:127.0.0.1:{port} ' for port in tunnels]))}
 Access in browser:
-http://localhost:3333 - benchmark webapp
-http://localhost:8006 - forwarder F status
-http://localhost:8001 - trafficgen A status
-http://localhost:8002 - trafficgen B status
+{chr(10).join(pages)}
+Or run headless parameter sweeps on the forwarder node:
+python3 benchrun.py --fwds 2 4 8 --payload 1000 8000 --producer pingserver{' fileserver' if WANT_FILESERVER else ''}
 ''')
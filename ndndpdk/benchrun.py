@@ -0,0 +1,284 @@
+import argparse
+import itertools
+import json
+import os.path
+import time
+
+import perfcap
+from ndndpdk_gql import GqlClient
+from ndndpdk_mem import BENCHMARK_FW_MEMPOOL, BENCHMARK_TG_MEMPOOL, plan_memory
+from telemetry import Sampler
+
+parser = argparse.ArgumentParser(
+    description='Run NDN-DPDK benchmark headlessly with parameter sweeps.')
+parser.add_argument('--env', default='~/ndn-dpdk/sample/benchmark/.env',
+                    help='benchmark .env file written by benchmark.py')
+parser.add_argument('--output', default='benchrun.jsonl',
+                    help='results file, one JSON record per run, appended')
+parser.add_argument('--producer', nargs='+', default=['pingserver'], choices=['pingserver', 'fileserver'],
+                    help='producer kinds to sweep')
+parser.add_argument('--fwds', type=int, nargs='+', default=[2],
+                    help='forwarding thread counts to sweep')
+parser.add_argument('--rxqueues', type=int, nargs='+', default=[1],
+                    help='RX queue counts on each forwarder face to sweep')
+parser.add_argument('--payload', type=int, nargs='+', default=[1000],
+                    help='Data payload lengths to sweep; segmentLen if fileserver')
+parser.add_argument('--flows', type=int, default=2,
+                    help='fetch tasks per direction')
+parser.add_argument('--fs-file', default='1G.bin',
+                    help='file retrieved from fileserver, relative to *_FILESERVER_PATH')
+parser.add_argument('--warmup', type=float, default=5,
+                    help='seconds before measurement')
+parser.add_argument('--duration', type=float, default=30,
+                    help='seconds of measurement')
+parser.add_argument('--repeat', type=int, default=1,
+                    help='repetitions of each parameter combination')
+parser.add_argument('--telemetry', type=float, default=0,
+                    help='forwarder counter sampling interval in seconds during measurement; 0 to disable')
+parser.add_argument('--telemetry-dir', default='.',
+                    help='directory to save forwarder counter samples as CSV, one file per run')
+parser.add_argument('--perf', metavar='DIR',
+                    help='record CPU samples of local forwarder F with perf during measurement, saved in DIR/<run time>')
+args = parser.parse_args()
+
+FETCH_SEGMENT_END = 2**53
+
+GQL_ACTIVATE_FORWARDER = 'mutation activate($arg: JSON!) { activate(forwarder: $arg) }'
+GQL_ACTIVATE_TRAFFICGEN = 'mutation activate($arg: JSON!) { activate(trafficgen: $arg) }'
+GQL_CREATE_FACE = 'mutation createFace($locator: JSON!) { createFace(locator: $locator) { id } }'
+GQL_INSERT_FIB = 'mutation insertFibEntry($name: Name!, $nexthops: [ID!]!) { insertFibEntry(name: $name, nexthops: $nexthops) { id } }'
+GQL_START_TRAFFICGEN = '''
+mutation startTrafficGen($face: JSON!, $producer: TgpConfig, $fileServer: FileServerConfig, $fetcher: FetcherConfig) {
+  startTrafficGen(face: $face, producer: $producer, fileServer: $fileServer, fetcher: $fetcher) { id fetcher { id } }
+}'''
+GQL_FETCH = 'mutation fetch($fetcher: ID!, $task: FetchTaskDef!) { fetch(fetcher: $fetcher, task: $task) { id } }'
+GQL_FETCH_COUNTERS = 'query counters($id: ID!) { node(id: $id) { ... on FetchTaskContext { counters { nRxData sRtt } } } }'
+GQL_DELETE = 'mutation delete($id: ID!) { delete(id: $id) }'
+
+
+def load_env(filename: str) -> dict[str, str]:
+    env = {}
+    with open(os.path.expanduser(filename)) as f:
+        for line in f:
+            line = line.strip()
+            if line == '' or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            env[key] = value
+    return env
+
+
+def allocate_cores(env: dict[str, str], id: str, demand: dict[str, int]) -> dict:
+    """
+    Construct EAL and lcoreAlloc sections from *_CORES_PRIMARY and *_CORES_SECONDARY.
+
+    *_CORES_PRIMARY lists one hyperthread of each physical core before their siblings.
+    RX and TX roles are allocated from the back of the list and other roles from the front,
+    so that forwarding threads occupy distinct physical cores and share them only with RX or TX threads.
+
+    :param id: node identifier, such as 'F'.
+    :param demand: each key is a lcore role; each value is number of lcores needed.
+    """
+    primary = perfcap.parse_cpus(env[f'{id}_CORES_PRIMARY'])
+    secondary = perfcap.parse_cpus(env[f'{id}_CORES_SECONDARY'])
+    if sum(demand.values()) > len(primary):
+        raise ValueError(
+            f'{id} needs {sum(demand.values())} lcores but {id}_CORES_PRIMARY has {len(primary)}')
+    lcore_alloc = {}
+    for role, n in demand.items():
+        if role in ('RX', 'TX'):
+            lcore_alloc[role] = primary[len(primary)-n:]
+            primary = primary[:len(primary)-n]
+        else:
+            lcore_alloc[role] = primary[:n]
+            primary = primary[n:]
+    return {
+        'eal': {
+            'cores': sorted(sum(lcore_alloc.values(), []) + secondary),
+            'lcoreMain': secondary[0],
+        },
+        'lcoreAlloc': lcore_alloc,
+    }
+
+
+def load_topology(env: dict[str, str]) -> dict[str, list[str]]:
+    """
+    Read forwarders and their trafficgens from FORWARDERS and *_TRAFFICGENS.
+    An .env file without these keys has forwarder F with trafficgens A and B.
+
+    :returns: each key is a forwarder identifier; each value is a list of trafficgen identifiers.
+    """
+    return {fw: env.get(f'{fw}_TRAFFICGENS', 'A,B').split(',') for fw in env.get('FORWARDERS', 'F').split(',')}
+
+
+def make_locator(env: dict[str, str], local: str, remote: str, *, rxqueues=1) -> dict:
+    return {
+        'scheme': 'ether',
+        'pciAddr': env[f'{local}_PORT_{remote}'],
+        'vlan': int(env[f'{local}_VLAN_{remote}']),
+        'local': env[f'{local}_HWADDR_{remote}'],
+        'remote': env[f'{remote}_HWADDR_{local}'],
+        'nRxQueues': rxqueues,
+        'portConfig': {'mtu': 9000},
+    }
+
+
+def setup(env: dict[str, str], clients: dict[str, GqlClient], *, producer: str, fwds: int, rxqueues: int, payload: int) -> dict[str, dict]:
+    """
+    Restart and activate forwarders and trafficgens.
+
+    :param fwds: forwarding thread count on each forwarder.
+    :returns: each key is a trafficgen identifier; each value has fetcher ID and fetch task names.
+    """
+    for client in clients.values():
+        client.restart()
+
+    fs_prefix = 'fs'
+    tgs = {}
+    for fw, group in topology.items():
+        fw_cfg = allocate_cores(env, fw, {
+            'RX': len(group) * rxqueues,
+            'TX': len(group),
+            'FWD': fwds,
+        })
+        fw_cfg['mempool'] = BENCHMARK_FW_MEMPOOL
+        plan_memory(fw_cfg, numa=int(env.get(f'{fw}_NUMA_PRIMARY', 0)))
+        clients[fw].request(GQL_ACTIVATE_FORWARDER, {'arg': fw_cfg})
+        for tg in group:
+            face = clients[fw].request(GQL_CREATE_FACE, {
+                'locator': make_locator(env, fw, tg, rxqueues=rxqueues)})['createFace']
+            clients[fw].request(GQL_INSERT_FIB, {
+                'name': f'/{tg}', 'nexthops': [face['id']]})
+
+        for tg in group:
+            tg_cfg = allocate_cores(env, tg, {
+                'RX': 1,
+                'TX': 1,
+                'PRODUCER': 1,
+                'CONSUMER': 1,
+            })
+            tg_cfg['mempool'] = BENCHMARK_TG_MEMPOOL
+            plan_memory(tg_cfg, numa=int(env.get(f'{tg}_NUMA_PRIMARY', 0)))
+            clients[tg].request(GQL_ACTIVATE_TRAFFICGEN, {'arg': tg_cfg})
+
+            start = {
+                'face': make_locator(env, tg, fw),
+                'fetcher': {'nThreads': 1, 'nTasks': args.flows},
+            }
+            if producer == 'pingserver':
+                start['producer'] = {
+                    'nThreads': 1,
+                    'patterns': [{
+                        'prefix': f'/{tg}/{i}',
+                        'replies': [{'payloadLen': payload, 'freshnessPeriod': 1}],
+                    } for i in range(args.flows)],
+                }
+            else:
+                start['fileServer'] = {
+                    'nThreads': 1,
+                    'mounts': [{'prefix': f'/{tg}/{fs_prefix}', 'path': env[f'{tg}_FILESERVER_PATH']}],
+                    'segmentLen': payload,
+                }
+            gen = clients[tg].request(GQL_START_TRAFFICGEN, start)['startTrafficGen']
+            tgs[tg] = {'fetcher': gen['fetcher']['id']}
+
+        # each trafficgen retrieves from the next trafficgen on the same forwarder
+        for j, tg in enumerate(group):
+            peer = group[(j + 1) % len(group)]
+            if producer == 'pingserver':
+                tgs[tg]['names'] = [f'/{peer}/{i}' for i in range(args.flows)]
+            else:
+                tgs[tg]['names'] = [f'/{peer}/{fs_prefix}/{args.fs_file}'] * args.flows
+    return tgs
+
+
+def read_counters(clients: dict[str, GqlClient], tasks: list[tuple[str, str]]) -> list[dict]:
+    return [clients[tg].request(GQL_FETCH_COUNTERS, {'id': id})['node']['counters'] for tg, id in tasks]
+
+
+def run_once(env: dict[str, str], clients: dict[str, GqlClient], params: dict) -> dict:
+    """
+    Perform one benchmark run.
+
+    :returns: result record containing params, throughput in Gbps, and smoothed RTT in milliseconds.
+    """
+    record = dict(params)
+    record.update({'time': int(time.time()),
+                  'gbps': None, 'rtt': None, 'error': None})
+    tasks = []
+    samplers = {}
+    perf = None
+    try:
+        tgs = setup(env, clients, **params)
+        for tg, info in tgs.items():
+            for name in info['names']:
+                task = clients[tg].request(GQL_FETCH, {'fetcher': info['fetcher'], 'task': {
+                    'prefix': name,
+                    'segmentEnd': FETCH_SEGMENT_END,
+                }})['fetch']
+                tasks.append((tg, task['id']))
+        time.sleep(args.warmup)
+        if args.telemetry > 0:
+            for fw in topology:
+                samplers[fw] = Sampler(clients[fw], interval=args.telemetry,
+                                       capacity=int(args.duration / args.telemetry) + 2)
+                samplers[fw].start()
+        if args.perf is not None:
+            # perf samples the local node, which is forwarder F
+            perf = perfcap.start(perfcap.parse_cpus(env['F_CORES_PRIMARY']), duration=args.duration,
+                                 out_dir=os.path.join(args.perf, str(record['time'])))
+        t0, cnt0 = time.time(), read_counters(clients, tasks)
+        time.sleep(args.duration)
+        t1, cnt1 = time.time(), read_counters(clients, tasks)
+        if perf is not None and perf.wait() != 0:
+            raise RuntimeError(f'perf capture failed with exit code {perf.returncode}')
+        for fw, sampler in samplers.items():
+            sampler.stop()
+            sampler.export_csv(os.path.join(
+                args.telemetry_dir, f"benchrun-{record['time']}.csv" if fw == 'F' else f"benchrun-{record['time']}-{fw}.csv"))
+            record['faces' if fw == 'F' else f'faces_{fw}'] = sampler.summary()
+
+        n_data = sum([c1['nRxData'] - c0['nRxData']
+                     for c0, c1 in zip(cnt0, cnt1)])
+        record['gbps'] = n_data * params['payload'] * 8 / (t1 - t0) / 1e9
+        # sRtt is reported in nanoseconds
+        record['rtt'] = sum([c['sRtt'] for c in cnt1]) / len(cnt1) / 1e6
+    except Exception as e:
+        record['error'] = str(e)
+    finally:
+        # teardown also runs after a failed run, so that nothing outlives it
+        for sampler in samplers.values():
+            sampler.stop()
+        if perf is not None:
+            perfcap.stop(perf)
+        for tg, id in tasks:
+            try:
+                clients[tg].request(GQL_DELETE, {'id': id})
+            except Exception:
+                pass
+    return record
+
+
+env = load_env(args.env)
+topology = load_topology(env)
+clients = {id: GqlClient(env[f'{id}_GQLSERVER'])
+           for id in list(topology) + sum(topology.values(), [])}
+
+sweep = [dict(zip(['producer', 'fwds', 'rxqueues', 'payload'], values)) for values in itertools.product(
+    args.producer, args.fwds, args.rxqueues, args.payload)] * args.repeat
+
+records = []
+for i, params in enumerate(sweep):
+    record = run_once(env, clients, params)
+    records.append(record)
+    with open(args.output, 'a') as f:
+        print(json.dumps(record), file=f)
+    status = f"ERROR {record['error']}" if record['error'] is not None else f"{record['gbps']:.3f} Gbps {record['rtt']:.3f} ms"
+    print(f"[{i+1}/{len(sweep)}] {' '.join([f'{k}={v}' for k, v in params.items()])} {status}")
+
+print('')
+print(f"{'producer'.ljust(10)} | {'fwds'.rjust(4)} | {'rxq'.rjust(3)} | {'payload'.rjust(7)} | {'Gbps'.rjust(8)} | {'RTT ms'.rjust(8)}")
+for record in records:
+    gbps = 'ERROR' if record['gbps'] is None else f"{record['gbps']:.3f}"
+    rtt = 'ERROR' if record['rtt'] is None else f"{record['rtt']:.3f}"
+    print(f"{record['producer'].ljust(10)} | {str(record['fwds']).rjust(4)} | {str(record['rxqueues']).rjust(3)} | {str(record['payload']).rjust(7)} | {gbps.rjust(8)} | {rtt.rjust(8)}")
@@ -0,0 +1,126 @@
+import argparse
+import shlex
+import subprocess
+import time
+
+from fabrictestbed_extensions.fablib.fablib import \
+    FablibManager as fablib_manager
+from fabrictestbed_extensions.fablib.node import Node
+
+parser = argparse.ArgumentParser(
+    description='Synchronize NDN-DPDK working tree to dpdkdev nodes, rebuild, and restart services.')
+parser.add_argument('slice_name', metavar='SLICE-NAME',
+                    help='dpdkdev slice name, such as dpdkdev@1700000000')
+parser.add_argument('--primary', default='n0',
+                    help='node whose ~/ndn-dpdk is the source tree and relays to other nodes')
+parser.add_argument('--local', metavar='DIR',
+                    help='upload this local working tree to primary node first; requires rsync on JupyterLab')
+parser.add_argument('--make-env', nargs='*', default=[],
+                    help='environment variables passed to Makefile, same as dpdkdev.py')
+parser.add_argument('--no-build', action='store_true',
+                    help='synchronize only')
+parser.add_argument('--no-restart', action='store_true',
+                    help='do not restart ndndpdk-svc@ instances after build')
+args = parser.parse_args()
+
+# build outputs and installed node modules stay on each node, so that make is incremental
+RSYNC_OPTS = '-a --delete --exclude=/build/ --exclude=node_modules/'
+# printed by a remote step upon success
+STEP_OK = 'DPDKDEV-SYNC-OK'
+
+fablib = fablib_manager()
+slice = fablib.get_slice(name=args.slice_name)
+nodes = slice.get_nodes()
+primary = slice.get_node(name=args.primary)
+others = [node for node in nodes if node.get_name() != primary.get_name()]
+ctrl_addrs = {node.get_name(): node.get_interface(
+    network_name=f'FABNET_IPv4_{node.get_site()}').get_ip_addr() for node in nodes}
+
+
+def upload_local() -> None:
+    ssh = primary.get_ssh_command().split()
+    host = ssh[-1].split('@', 1)
+    target = f'{host[0]}@[{host[1]}]' if ':' in host[1] else ssh[-1]
+    subprocess.run(['rsync', *RSYNC_OPTS.split(), '-e', ' '.join(ssh[:-1]),
+                    f"{args.local.rstrip('/')}/", f'{target}:ndn-dpdk/'], check=True)
+
+
+def authorize_primary() -> None:
+    # primary node needs SSH access to other nodes over the control network
+    stdout, stderr = primary.execute('''
+        [[ -f ~/.ssh/id_ed25519 ]] || ssh-keygen -q -f ~/.ssh/id_ed25519 -N '' -C dpdkdev-sync -t ed25519
+        cat ~/.ssh/id_ed25519.pub
+    ''', quiet=True)
+    pubkey = stdout.strip()
+    execute_threads = {}
+    for node in others:
+        execute_threads[node] = node.execute_thread(
+            f'grep -qxF {shlex.quote(pubkey)} ~/.ssh/authorized_keys || echo {shlex.quote(pubkey)} >>~/.ssh/authorized_keys')
+    for thread in execute_threads.values():
+        thread.result()
+
+
+def step_cmd(cmds: list[str]) -> str:
+    # run in a subshell that stops at the first error, and print STEP_OK upon success
+    return '\n'.join(['(', 'set -eo pipefail'] + cmds + [f'echo {STEP_OK}', ')'])
+
+
+def sync_to(node: Node) -> str:
+    return step_cmd([
+        f"rsync {RSYNC_OPTS} -e 'ssh -o StrictHostKeyChecking=accept-new' ~/ndn-dpdk/ {ctrl_addrs[node.get_name()]}:ndn-dpdk/",
+    ])
+
+
+def build_cmd() -> str:
+    # services are restarted only if the build succeeds
+    cmds = [
+        'cd ~/ndn-dpdk',
+        f"env {' '.join(args.make_env)} make",
+        'sudo make install',
+    ]
+    if not args.no_restart:
+        cmds.append("sudo systemctl restart 'ndndpdk-svc@*'")
+    return step_cmd(cmds)
+
+
+t0 = time.time()
+if args.local is not None:
+    upload_local()
+    print(f'{primary.get_name()} upload {time.time()-t0:.1f}s')
+if len(others) > 0:
+    authorize_primary()
+
+# primary node relays to other nodes in parallel, and starts building its own tree meanwhile
+execute_threads = {}
+t = {}
+for node in others:
+    t[node.get_name()] = time.time()
+    execute_threads[node.get_name(), 'sync'] = primary.execute_thread(
+        sync_to(node))
+if not args.no_build:
+    t[primary.get_name()] = time.time()
+    execute_threads[primary.get_name(), 'build'] = primary.execute_thread(
+        build_cmd())
+failed = []
+while len(execute_threads) > 0:
+    for (name, step), thread in list(execute_threads.items()):
+        if not thread.done():
+            continue
+        del execute_threads[name, step]
+        try:
+            stdout, stderr = thread.result()
+        except Exception as e:
+            stdout, stderr = '', str(e)
+        if STEP_OK not in stdout:
+            # a failed sync does not build the stale tree
+            print(f'{name} {step} FAILED {time.time()-t[name]:.1f}s\n{stderr.strip()}')
+            failed.append(f'{name} {step}')
+            continue
+        print(f'{name} {step} {time.time()-t[name]:.1f}s')
+        if step == 'sync' and not args.no_build:
+            execute_threads[name, 'build'] = slice.get_node(
+                name=name).execute_thread(build_cmd())
+    time.sleep(1)
+print(f'Completed in {time.time()-t0:.1f}s')
+if len(failed) > 0:
+    raise SystemExit(f"Failed: {', '.join(failed)}")
@@ -19,6 +19,8 @@ CORES3030, CORES3031 = 10, 6
 NIC_MODEL = 'NIC_Basic'
 # whether to create NVMe device for fileserver development
 WANT_NVME = False
+# local directory to cache NDN-DPDK builds across slices, or None to disable
+NDNDPDK_CACHE = None
 # WireGuard client IPs and keys
 V4WG_CLIENTS = [
     ('192.168.164.40', 'sDCCYU0r9TwugEDzTMDyfJ1eA+YwAyXf+EN3Hzj7QUo='),
@@ -40,6 +42,7 @@ for i in range(NODE_COUNT):
     intfs += node.add_component(model=NIC_MODEL, name='nic').get_interfaces()
     if WANT_NVME:
         node.add_component(model='NVME_P4510', name='disk')
+    node.add_fabnet()
     del node
 slice.add_l2network(name='net', interfaces=intfs)
 del intfs
@@ -48,6 +51,9 @@ slice.submit()
 
 v4wg.enable(slice, V4WG_CLIENTS)
 
+ctrl_addrs = {node.get_name(): node.get_interface(
+    network_name=f'FABNET_IPv4_{node.get_site()}').get_ip_addr() for node in slice.get_nodes()}
+
 execute_threads = {}
 for node in slice.get_nodes():
     execute_threads[node] = node.execute_thread(f'''
@@ -62,8 +68,8 @@ for thread in execute_threads.values():
 slice.wait_ssh(progress=True)
 slice.post_boot_config()
 
-for node in slice.get_nodes():
-    node.execute(ndndpdk_common.dl_build_cmd(make_env=[]))
+ndndpdk_common.build_distribute(
+    slice.get_nodes(), ctrl_addrs, make_env=[], cache_dir=NDNDPDK_CACHE)
 
 for node in slice.get_nodes():
     print(f'{node.get_name()} {node.get_management_ip()}')
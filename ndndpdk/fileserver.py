@@ -1,4 +1,5 @@
 import json
+import re
 import shlex
 import time
 
@@ -26,6 +27,20 @@ FS_PREFIX = f'/fileserver.{slice_num}'
 FS_PATH = '/srv/fileserver'
 # segment length served by the file server
 FS_SEGMENTLEN = 6*1024
+# if True, run retrieval benchmark from a local consumer after deployment
+WANT_BENCHMARK = False
+# benchmark corpus, list of (file count, file size in bytes); files contain random bytes
+BENCH_CORPUS = [(8, 2**20), (4, 64*2**20), (2, 2**30)]
+# benchmark segment lengths and memif datarooms; combinations where a segment does not fit in dataroom are skipped
+BENCH_SEGMENTLENS, BENCH_DATAROOMS = [1024, 4096, 6*1024, 8000], [9000]
+# benchmark ndncatchunks pipeline settings, each is a list of arguments
+BENCH_PIPELINES = [
+    ['--pipeline-type', 'cubic'],
+    ['--pipeline-type', 'aimd'],
+    ['--pipeline-type', 'fixed', '--pipeline-size', '64'],
+]
+# benchmark results file
+BENCH_RESULTS = 'fileserver-bench.json'
 
 # no need to change anything below
 
@@ -51,7 +66,7 @@ node.execute(f'''
     echo 'set enable-bracketed-paste off' | sudo tee -a /etc/inputrc
     sudo hostnamectl set-hostname {node.get_name()}
     echo "deb [arch=amd64 trusted=yes] https://nfd-nightly-apt.ndn.today/ubuntu jammy main" | sudo tee /etc/apt/sources.list.d/nfd-nightly.list
-    {ndndpdk_common.apt_install_cmd(extra_pkgs=['ndnpeek', 'ndnsec', 'nfd'])}
+    {ndndpdk_common.apt_install_cmd(extra_pkgs=['ndnpeek', 'ndnsec', 'nfd'] + (['ndnchunks'] if WANT_BENCHMARK else []))}
     sudo loginctl enable-linger {node.get_username()}
     sudo systemctl reboot
 ''')
@@ -93,19 +108,8 @@ node.execute(f'''
     sudo systemctl disable --now nfd
 ''')
 
-# set CPU isolation
-node.execute(f"""
-    {ndndpdk_common.cpuset_cmd(node, instances={
-        '127.0.0.1:3030': 6,
-        '127.0.0.1:3031': 4,
-    })}
-    sudo systemctl reboot
-""")
-slice.wait_ssh(progress=True)
-
 FW_ACTIVATE = {
     'eal': {
-        'memPerNuma': {'0': 12*1024},
         'filePrefix': 'fw',
         'disablePCI': True,
     },
@@ -129,7 +133,6 @@ FW_MEMIF = {
 }
 FS_ACTIVATE = {
     'eal': {
-        'memPerNuma': {'0': 6*1024},
         'filePrefix': 'fs',
         'disablePCI': True,
     },
@@ -152,6 +155,20 @@ FS_ACTIVATE = {
         'segmentLen': FS_SEGMENTLEN,
     },
 }
+# memPerNuma and hugepages are derived from mempool configuration
+FW_MEMORY = ndndpdk_common.plan_memory(FW_ACTIVATE)
+FS_MEMORY = ndndpdk_common.plan_memory(FS_ACTIVATE)
+
+# set CPU isolation, reserve hugepages at boot
+node.execute(f"""
+    {ndndpdk_common.cpuset_cmd(node, instances={
+        '127.0.0.1:3030': 6,
+        '127.0.0.1:3031': 4,
+    })}
+    {ndndpdk_common.hugepages_boot_cmd(FW_MEMORY, FS_MEMORY)}
+    sudo systemctl reboot
+""")
+slice.wait_ssh(progress=True)
 
 nfdregCmd = 'ndndpdk-godemo --gqlserver http://127.0.0.1:3030/ nfdreg'
 nfdregCmd += ' --signer ~/keychain/pvt.safebag --signer-pass 0 '
@@ -171,7 +188,7 @@ node.execute(f'''
     sudo $CTRL_FW systemd stop || true
     sudo $CTRL_FS systemd stop || true
 
-    {ndndpdk_common.hugepages_cmd(size=18)}
+    dpdk-hugepages.py --show
 
     sudo $CTRL_FW systemd start
     echo {shlex.quote(json.dumps(FW_ACTIVATE))} | $CTRL_FW activate-forwarder
@@ -201,3 +218,128 @@ List directory or retrieve file from this fileserver:
 ndncatchunks -q {FS_PREFIX}/32=ls | tr '\\0' '\\n'
 ndncatchunks -v {FS_PREFIX}/1G.bin >/dev/null 2>catchunks.log
 ''')
+
+if not WANT_BENCHMARK:
+    exit()
+
+# local NFD listens on an alternate UDP port, so that it does not conflict with NDN-DPDK face toward the router;
+# ports are outside NFD defaults such as 56363 for UDP multicast, so that no multicast traffic enters this channel;
+# ndncatchunks retrieves via NFD, which reaches the forwarder over loopback UDP,
+# hence goodput is bounded by NFD and may not reflect segment length or dataroom
+NFD_PORT, FW_NFD_PORT = 6366, 6367
+BENCH_HEADROOM = 600
+FW_NFD = {
+    'scheme': 'udp',
+    'local': f'127.0.0.1:{FW_NFD_PORT}',
+    'remote': f'127.0.0.1:{NFD_PORT}',
+    'mtu': 9000,
+}
+corpus = [(f'corpus/{size}-{i}.bin', size)
+          for count, size in BENCH_CORPUS for i in range(count)]
+corpus_cmds = [f'mkdir -p {shlex.quote(FS_PATH)}/corpus']
+for name, size in corpus:
+    path = shlex.quote(f'{FS_PATH}/{name}')
+    # skip existing file of correct size, so that re-running the benchmark does not rewrite the corpus
+    corpus_cmds.append(
+        f'[[ $(stat -c %s {path} 2>/dev/null) == {size} ]] || head -c {size} /dev/urandom >{path}')
+corpus_cmd = '\n'.join(corpus_cmds)
+
+node.execute(f'''
+    {corpus_cmd}
+
+    sudo sed -i '/^  udp$/,/^  }}$/ s/port 6363/port {NFD_PORT}/' /etc/ndn/nfd.conf
+    sudo systemctl restart nfd
+    CTRL_FW='ndndpdk-ctrl --gqlserver http://127.0.0.1:3030/'
+    FW_NFD_FACE=$(echo {shlex.quote(json.dumps(FW_NFD))} | $CTRL_FW create-face)
+    echo $FW_NFD_FACE
+    NFD_FACE=$(nfdc face create udp4://127.0.0.1:{FW_NFD_PORT} | grep -oP 'id=\\K[0-9]+')
+    nfdc route add {shlex.quote(FS_PREFIX)} $NFD_FACE
+''')
+
+
+def parse_catchunks(stderr: str) -> dict:
+    """
+    Parse ndncatchunks statistics.
+    Returns goodput in bit/s, RTT average in milliseconds, and retransmitted segments.
+    Only the goodput line is required; RTT and retransmissions are None if absent, such as with fixed pipeline.
+    """
+    m = re.search(r'Goodput: ([.\d]+) ([kMG]?)bit/s', stderr)
+    if m is None:
+        raise ValueError('ndncatchunks goodput missing')
+    goodput = float(m[1]) * {'': 1, 'k': 1e3, 'M': 1e6, 'G': 1e9}[m[2]]
+    m = re.search(r'RTT min/avg/max = [.\d]+/([.\d]+)/[.\d]+ ms', stderr)
+    rtt = None if m is None else float(m[1])
+    m = re.search(r'Retransmitted segments: (\d+)', stderr)
+    retx = None if m is None else int(m[1])
+    return {'goodput': goodput, 'rtt': rtt, 'retx': retx}
+
+
+def bench_setting(segment_len: int, dataroom: int, pipeline: list[str]) -> dict:
+    """
+    Restart fileserver with segment length and memif dataroom, then retrieve every corpus file.
+    Returns goodput in Mbps, average RTT in milliseconds, retransmitted segments, and error.
+    RTT and retransmitted segments are None if ndncatchunks did not report them.
+    """
+    fs_activate = json.loads(json.dumps(FS_ACTIVATE))
+    fs_activate['face']['dataroom'] = dataroom
+    fs_activate['fileServer']['segmentLen'] = segment_len
+    fw_memif = dict(FW_MEMIF, dataroom=dataroom)
+    stdout, stderr = node.execute(f'''
+        CTRL_FW='ndndpdk-ctrl --gqlserver http://127.0.0.1:3030/'
+        CTRL_FS='ndndpdk-ctrl --gqlserver http://127.0.0.1:3031/'
+        sudo $CTRL_FS systemd stop || true
+        for ID in $($CTRL_FW list-faces | jq -r 'select(.locator.scheme=="memif") | .id'); do
+            $CTRL_FW destroy-face --id $ID
+        done
+        FW_MEMIF_FACE=$(echo {shlex.quote(json.dumps(fw_memif))} | $CTRL_FW create-face)
+        $CTRL_FW insert-fib --name {shlex.quote(FS_PREFIX)} --nh $(echo $FW_MEMIF_FACE | jq -r .id) >/dev/null
+        sudo $CTRL_FS systemd start
+        echo {shlex.quote(json.dumps(fs_activate))} | $CTRL_FS activate-fileserver >/dev/null
+        sleep 2
+        for NAME in {' '.join([shlex.quote(name) for name, size in corpus])}; do
+            echo @@@$NAME
+            ndncatchunks {' '.join([shlex.quote(arg) for arg in pipeline])} {shlex.quote(FS_PREFIX)}/$NAME 2>&1 >/dev/null
+        done
+    ''', quiet=True)
+    result = {'goodput': None, 'rtt': None, 'retx': None, 'error': None}
+    try:
+        runs = [parse_catchunks(part) for part in stdout.split('@@@')[1:]]
+        if len(runs) != len(corpus):
+            raise ValueError('ndncatchunks output mismatch')
+        for run, (name, size) in zip(runs, corpus):
+            run['elapsed'] = size * 8 / run['goodput']
+        elapsed = sum([run['elapsed'] for run in runs])
+        result['goodput'] = sum([size for name, size in corpus]) * 8 / elapsed / 1e6
+        rtt_runs = [run for run in runs if run['rtt'] is not None]
+        if len(rtt_runs) > 0:
+            result['rtt'] = sum([run['rtt'] * run['elapsed'] for run in rtt_runs]) / \
+                sum([run['elapsed'] for run in rtt_runs])
+        if any(run['retx'] is not None for run in runs):
+            result['retx'] = sum([run['retx'] or 0 for run in runs])
+    except (ValueError, ZeroDivisionError):
+        result['error'] = 'ndncatchunks failed'
+    return result
+
+
+settings = [(segment_len, dataroom, pipeline) for segment_len in BENCH_SEGMENTLENS
+            for dataroom in BENCH_DATAROOMS if segment_len + BENCH_HEADROOM <= dataroom
+            for pipeline in BENCH_PIPELINES]
+records = []
+for i, (segment_len, dataroom, pipeline) in enumerate(settings):
+    record = {'segmentLen': segment_len, 'dataroom': dataroom, 'pipeline': ' '.join(pipeline)}
+    record.update(bench_setting(segment_len, dataroom, pipeline))
+    records.append(record)
+    print(f'[{i+1}/{len(settings)}] {record}')
+with open(BENCH_RESULTS, 'w') as f:
+    json.dump(records, f, indent=2)
+
+print('')
+print(f"{'segmentLen'.rjust(10)} | {'dataroom'.rjust(8)} | {'pipeline'.ljust(40)} | {'Mbps'.rjust(8)} | {'RTT ms'.rjust(8)} | {'retx'.rjust(6)}")
+for record in records:
+    if record['error'] is not None:
+        stats = f"{'ERROR'.rjust(8)} | {''.rjust(8)} | {''.rjust(6)}"
+    else:
+        rtt = '-' if record['rtt'] is None else f"{record['rtt']:.3f}"
+        retx = '-' if record['retx'] is None else str(record['retx'])
+        stats = f"{record['goodput']:8.1f} | {rtt.rjust(8)} | {retx.rjust(6)}"
+    print(f"{str(record['segmentLen']).rjust(10)} | {str(record['dataroom']).rjust(8)} | {record['pipeline'].ljust(40)} | {stats}")
@@ -0,0 +1,113 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Stand-in for NDN-DPDK GraphQL endpoints, so that benchrun.py and telemetry.py can be exercised without a slice.
+# Requests are matched by operation, not parsed as GraphQL.
+
+FACE_FIELDS = ['rxFrames', 'rxOctets', 'rxInterests', 'rxData', 'rxNacks',
+               'txFrames', 'txOctets', 'txInterests', 'txData', 'txNacks']
+
+
+def check_activate(arg: dict) -> str | None:
+    """
+    Validate the parts of activation parameters that benchrun.py constructs.
+
+    :returns: error message, or None if valid.
+    """
+    eal = arg.get('eal', {})
+    if not all(isinstance(cpu, int) for cpu in eal.get('cores', [])):
+        return 'eal.cores must be a list of lcore numbers'
+    if 'lcoreMain' in eal and eal['lcoreMain'] not in eal.get('cores', []):
+        return 'eal.lcoreMain must be in eal.cores'
+    for role, rc in arg.get('lcoreAlloc', {}).items():
+        # RoleConfig is either a list of lcore numbers or an object of NUMA socket to lcore count
+        if isinstance(rc, list):
+            if not all(isinstance(lc, int) for lc in rc):
+                return f'lcoreAlloc.{role} must contain lcore numbers'
+        elif not (isinstance(rc, dict) and all(k.isdigit() and isinstance(v, int) for k, v in rc.items())):
+            return f'lcoreAlloc.{role} must be a list of lcores or a per-NUMA count object'
+    for numa, mib in eal.get('memPerNuma', {}).items():
+        if not (str(numa).isdigit() and isinstance(mib, int)):
+            return 'eal.memPerNuma must map NUMA socket to MiB'
+    return None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    t0 = time.time()
+    pps = 1e6
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        req = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        query, variables = req['query'], req.get('variables', {})
+        k = int((time.time() - self.t0) * self.pps)
+        data, error = None, None
+        if 'shutdown' in query:
+            data = {'shutdown': True}
+        elif 'version' in query:
+            data = {'version': {'version': 'gqlstub'}}
+        elif 'activate' in query:
+            error = check_activate(variables['arg'])
+            data = {'activate': True}
+        elif 'createFace' in query:
+            data = {'createFace': {'id': 'face0'}}
+        elif 'insertFibEntry' in query:
+            data = {'insertFibEntry': {'id': 'fib0'}}
+        elif 'startTrafficGen' in query:
+            data = {'startTrafficGen': {'id': 'tg0', 'fetcher': {'id': 'fetcher0'}}}
+        elif 'fetch(' in query:
+            data = {'fetch': {'id': 'task0'}}
+        elif 'FetchTaskContext' in query:
+            data = {'node': {'counters': {'nRxData': k, 'sRtt': 2500000}}}
+        elif 'faceCounters' in query:
+            data = {'faces': [{'id': 'face0', 'counters': {
+                field: k for field in FACE_FIELDS}}]}
+        elif 'fwdCounters' in query:
+            data = {'fwdp': {'fwds': [
+                {'id': 'fwd0', 'counters': {'nInterests': k, 'nData': k}}]}}
+        elif 'delete' in query:
+            data = {'delete': True}
+        else:
+            error = 'operation not supported by gqlstub'
+        body = json.dumps({'errors': [{'message': error}]} if error is not None else {
+                          'data': data}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Serve stub NDN-DPDK GraphQL endpoints for forwarder F and trafficgens A, B.')
+    parser.add_argument('--port', type=int, default=3030,
+                        help='port of forwarder F; trafficgens A and B use the next ports')
+    parser.add_argument('--env', default='gqlstub.env',
+                        help='write benchmark .env file pointing to the stub endpoints')
+    args = parser.parse_args()
+
+    ids = ['F', 'A', 'B']
+    env = {}
+    for i, id in enumerate(ids):
+        env[f'{id}_GQLSERVER'] = f'http://127.0.0.1:{args.port + i}/'
+        env[f'{id}_NUMA_PRIMARY'] = 0
+        env[f'{id}_CORES_PRIMARY'] = '6-23'
+        env[f'{id}_CORES_SECONDARY'] = '4,5'
+        if id != 'F':
+            env[f'{id}_FILESERVER_PATH'] = '/srv/fileserver'
+            env[f'F_PORT_{id}'], env[f'F_VLAN_{id}'], env[f'F_HWADDR_{id}'] = f'07:0{i}.0', 0, f'02:00:00:00:0f:0{i}'
+            env[f'{id}_PORT_F'], env[f'{id}_VLAN_F'], env[f'{id}_HWADDR_F'] = '07:00.0', 0, f'02:00:00:00:0{i}:0f'
+    with open(args.env, 'w') as f:
+        f.write('\n'.join([f'{key}={value}' for key, value in env.items()]) + '\n')
+
+    servers = [ThreadingHTTPServer(('127.0.0.1', args.port + i), StubHandler)
+               for i in range(len(ids))]
+    for server in servers[1:]:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f'{args.env} written, serving ports {args.port}-{args.port + len(ids) - 1}')
+    servers[0].serve_forever()
@@ -1,20 +1,69 @@
+import hashlib
+import json
+import os.path
+import re
 import shlex
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable
 
 from fabrictestbed_extensions.fablib.node import Node
 
+# plan_memory is re-exported for scripts that use ndndpdk_common only, such as fileserver.py
+from ndndpdk_mem import plan_memory  # noqa: F401
+
 DEFAULT_GIT_REPO = 'https://github.com/usnistgov/ndn-dpdk.git'
 """URI of NDN-DPDK main git repository."""
 
+ARTIFACT_DIR = '/var/cache/ndndpdk'
+"""Directory of NDN-DPDK build artifacts on each node."""
+
+ARTIFACT_PORT = 8099
+"""TCP port for serving NDN-DPDK build artifacts over the control network."""
+
+APT_PROXY_PORT = 3142
+"""TCP port of apt-cacher-ng caching proxy."""
+
+ARTIFACT_FORMAT = 2
+"""Build artifact layout version, part of build key so that artifacts in an older layout are not reused."""
+
+ARTIFACT_INSTALLED = 'NDNDPDK-ARTIFACT-INSTALLED'
+"""Marker printed by install_artifact_cmd() upon success."""
+
+ARTIFACT_BUILT = 'NDNDPDK-ARTIFACT-BUILT'
+"""Marker printed by build_artifact() commands upon success."""
+
+
+def apt_proxy_cmd() -> str:
+    """
+    Construct commands to install apt-cacher-ng caching proxy.
+    Other nodes can use this proxy by passing apt_proxy to apt_install_cmd().
+    HTTPS repositories are tunneled without caching.
+    """
+    return '\n'.join([
+        'sudo apt update',
+        'sudo DEBIAN_FRONTEND=noninteractive apt install -y --no-install-recommends apt-cacher-ng',
+        "echo 'PassThroughPattern: .*:443$' | sudo tee /etc/apt-cacher-ng/zz-passthrough.conf",
+        'sudo systemctl restart apt-cacher-ng',
+    ])
+
 
-def apt_install_cmd(*, extra_pkgs=[]) -> str:
+def apt_install_cmd(*, extra_pkgs=[], apt_proxy: str | None = None) -> str:
     """
     Construct commands to install NDN-DPDK dependencies via APT.
 
     :param extra_pkgs: extra APT packages to install.
+    :param apt_proxy: APT caching proxy host:port, see apt_proxy_cmd(); None for direct download.
     """
     cmds: list[str] = []
-    pkgs = sorted(set(['httpie', 'iperf3', 'jq',
-                  'libibverbs-dev', 'linux-image-generic'] + extra_pkgs))
+    pkgs = sorted(set(['httpie', 'iperf3', 'jq', 'libibverbs-dev',
+                  'linux-image-generic', 'linux-tools-generic'] + extra_pkgs))
+    if apt_proxy is not None:
+        # HTTPS repositories are tunneled through the proxy via CONNECT, see PassThroughPattern in apt_proxy_cmd()
+        proxy_conf = f'Acquire::http::Proxy "http://{apt_proxy}";\nAcquire::https::Proxy "http://{apt_proxy}";'
+        cmds += [
+            f'echo {shlex.quote(proxy_conf)} | sudo tee /etc/apt/apt.conf.d/01proxy',
+        ]
     cmds += [
         'sudo apt update',
         'sudo DEBIAN_FRONTEND=noninteractive apt full-upgrade -y',
@@ -24,11 +73,12 @@ def apt_install_cmd(*, extra_pkgs=[]) -> str:
     return '\n'.join(cmds)
 
 
-def dl_build_cmd(*, repo=DEFAULT_GIT_REPO, depends_env: list[str] = [], depends_args: list[str] = [], make_env: list[str] = ['NDNDPDK_MK_RELEASE=1']) -> str:
+def dl_build_cmd(*, repo=DEFAULT_GIT_REPO, commit: str | None = None, depends_env: list[str] = [], depends_args: list[str] = [], make_env: list[str] = ['NDNDPDK_MK_RELEASE=1']) -> str:
     """
     Construct commands to download and install NDN-DPDK.
 
     :param repo: NDN-DPDK git repository.
+    :param commit: git commit to checkout; None for default branch.
     :param depends_env: environment variables passed to ndndpdk-depends.sh script.
     :param depends_args: arguments passed to ndndpdk-depends.sh script.
     :param make_env: environment variables passed to Makefile.
@@ -36,6 +86,9 @@ def dl_build_cmd(*, repo=DEFAULT_GIT_REPO, depends_env: list[str] = [], depends_
     return '\n'.join([
         f'git clone {shlex.quote(repo)} ~/ndn-dpdk',
         'cd ~/ndn-dpdk',
+    ] + ([] if commit is None else [
+        f'git checkout -q {shlex.quote(commit)}',
+    ]) + [
         f"env {' '.join(depends_env)} ./docs/ndndpdk-depends.sh -y {' '.join(depends_args)}",
         'corepack pnpm -s install',
         f"env {' '.join(make_env)} make",
@@ -43,26 +96,632 @@ def dl_build_cmd(*, repo=DEFAULT_GIT_REPO, depends_env: list[str] = [], depends_
     ])
 
 
-def cpuset_cmd(node: Node, *, instances: dict[str, int], pin_cpu: dict[str, str] = {}) -> str:
+def build_key(*, repo: str, commit: str, make_env: list[str]) -> str:
     """
-    Construct commands to configure CPU isolation.
+    Compute content address of an NDN-DPDK build.
+
+    :param repo: NDN-DPDK git repository.
+    :param commit: git commit ID.
+    :param make_env: environment variables passed to Makefile.
+    """
+    return hashlib.sha256(json.dumps([ARTIFACT_FORMAT, repo, commit, sorted(make_env)]).encode()).hexdigest()[:16]
+
+
+def package_cmd(key: str) -> str:
+    """
+    Construct commands to package installed NDN-DPDK and its dependencies as a build artifact.
+    The artifact contains /usr/local tree, ~/ndn-dpdk source tree, list of manually installed APT packages,
+    and APT sources and keys, such as NodeSource and LLVM repositories added by ndndpdk-depends.sh.
+
+    :param key: build key from build_key().
+    """
+    artifact = f'{ARTIFACT_DIR}/{key}'
+    return '\n'.join([
+        f'sudo mkdir -p {artifact}',
+        f'apt-mark showmanual | sudo tee {artifact}/apt.txt >/dev/null',
+        f'sudo tar -C / -czf {artifact}/apt.tar.gz $(cd / && ls -d etc/apt/sources.list.d etc/apt/keyrings etc/apt/trusted.gpg.d usr/share/keyrings 2>/dev/null)',
+        f'sudo tar -C / -czf {artifact}/local.tar.gz usr/local',
+        f'tar -C ~ -czf - ndn-dpdk | sudo tee {artifact}/src.tar.gz >/dev/null',
+        f'sudo touch {artifact}/done',
+    ])
+
+
+def install_artifact_cmd(url: str) -> str:
+    """
+    Construct commands to install NDN-DPDK from a build artifact.
+
+    Every file is downloaded before the existing installation is touched.
+    The commands run in a subshell that stops at the first error; ARTIFACT_INSTALLED is printed upon success.
+
+    :param url: base URL of the artifact, either http:// or file://.
+    """
+    return '\n'.join([
+        '(',
+        'set -eo pipefail',
+        'ARTIFACT_TMP=$(mktemp -d)',
+        'for F in apt.txt apt.tar.gz local.tar.gz src.tar.gz; do',
+        # the artifact server may still be binding its port
+        f'  curl -fsS --retry 10 --retry-connrefused --retry-delay 2 -o $ARTIFACT_TMP/$F {shlex.quote(url)}/$F',
+        'done',
+        'sudo tar -xzf $ARTIFACT_TMP/apt.tar.gz -C /',
+        'sudo apt-get update -qq',
+        'xargs -a $ARTIFACT_TMP/apt.txt sudo env DEBIAN_FRONTEND=noninteractive apt-get install -y -qq --no-install-recommends',
+        'sudo tar -xzf $ARTIFACT_TMP/local.tar.gz -C /',
+        'rm -rf ~/ndn-dpdk',
+        'tar -xzf $ARTIFACT_TMP/src.tar.gz -C ~',
+        'rm -rf $ARTIFACT_TMP',
+        'sudo ldconfig',
+        'sudo systemctl daemon-reload',
+        f'echo {ARTIFACT_INSTALLED}',
+        ')',
+    ])
+
+
+def install_artifact(node: Node, url: str) -> None:
+    """
+    Install NDN-DPDK from a build artifact, see install_artifact_cmd().
+
+    :raises RuntimeError: installation failed.
+    """
+    stdout, stderr = node.execute(install_artifact_cmd(url), quiet=True)
+    if ARTIFACT_INSTALLED not in stdout:
+        raise RuntimeError(
+            f'{node.get_name()} cannot install NDN-DPDK from {url}: {stderr.strip()}')
+
+
+def build_artifact(builder: Node, *, repo=DEFAULT_GIT_REPO, ref='HEAD',
+                   depends_env: list[str] = [], depends_args: list[str] = [], make_env: list[str] = ['NDNDPDK_MK_RELEASE=1'],
+                   cache_dir: str | None = None) -> str:
+    """
+    Build and install NDN-DPDK on a node, keeping the build artifact for other nodes.
+
+    Build artifacts are content-addressed by repository, commit, and make_env.
+    If the node already has the artifact, or it exists in cache_dir, the build is skipped.
+
+    :param builder: fablib Node instance.
+    :param repo: NDN-DPDK git repository.
+    :param ref: git branch or tag.
+    :param depends_env: environment variables passed to ndndpdk-depends.sh script.
+    :param depends_args: arguments passed to ndndpdk-depends.sh script.
+    :param make_env: environment variables passed to Makefile.
+    :param cache_dir: local directory on JupyterLab to cache build artifacts across slices; None to disable.
+    :returns: build key.
+    :raises RuntimeError: build failed.
+    """
+    stdout, stderr = builder.execute(
+        f'git ls-remote {shlex.quote(repo)} {shlex.quote(ref)}', quiet=True)
+    if len(stdout.split()) > 0:
+        commit = stdout.split()[0]
+    elif re.fullmatch(r'[0-9a-f]{40}', ref):
+        # ls-remote only lists refs; a full commit ID is used as is
+        commit = ref
+    else:
+        raise ValueError(f'ref {ref} not found in {repo}')
+    key = build_key(repo=repo, commit=commit, make_env=make_env)
+    artifact = f'{ARTIFACT_DIR}/{key}'
+    bundle = f'{key}.tar'
+    print(f'NDN-DPDK build {key} from {repo} {commit}')
+
+    stdout, stderr = builder.execute(
+        f'test -f {artifact}/done && echo HIT', quiet=True)
+    if stdout.strip() != 'HIT' and cache_dir is not None and os.path.exists(os.path.join(cache_dir, bundle)):
+        print(f'{builder.get_name()} uploading cached build {key}')
+        builder.upload_file(os.path.join(cache_dir, bundle), bundle)
+        builder.execute(
+            f'sudo mkdir -p {ARTIFACT_DIR} && sudo tar -xf {bundle} -C {ARTIFACT_DIR} && rm {bundle}', quiet=True)
+        stdout = 'HIT\n'
+    if stdout.strip() == 'HIT':
+        print(f'{builder.get_name()} installing cached build {key}')
+        install_artifact(builder, f'file://{artifact}')
+    else:
+        print(f'{builder.get_name()} building {key}')
+        # the artifact is marked done only if every build and package command succeeds
+        stdout, stderr = builder.execute('\n'.join([
+            '(',
+            'set -eo pipefail',
+            dl_build_cmd(repo=repo, commit=commit, depends_env=depends_env,
+                         depends_args=depends_args, make_env=make_env),
+            package_cmd(key),
+            f'echo {ARTIFACT_BUILT}',
+            ')',
+        ]))
+        if ARTIFACT_BUILT not in stdout:
+            raise RuntimeError(
+                f'{builder.get_name()} cannot build NDN-DPDK {key}: {stderr.strip()}')
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            builder.execute(
+                f'tar -cf {bundle} -C {ARTIFACT_DIR} {key}', quiet=True)
+            builder.download_file(os.path.join(cache_dir, bundle), bundle)
+            builder.execute(f'rm {bundle}', quiet=True)
+    return key
+
+
+def serve_artifact_cmd(addr: str) -> str:
+    """
+    Construct commands to serve build artifacts over the control network.
+    The server runs until serve_artifact_stop_cmd() or reboot.
+
+    :param addr: the node's control network IP address.
+    """
+    return f'sudo systemd-run --collect --unit=ndndpdk-artifact -- python3 -m http.server --bind {addr} --directory {ARTIFACT_DIR} {ARTIFACT_PORT}'
+
+
+def serve_artifact_stop_cmd() -> str:
+    """
+    Construct commands to stop serving build artifacts.
+    """
+    return 'sudo systemctl stop ndndpdk-artifact || true'
+
+
+def install_remote_artifact_cmd(builder_addr: str, key: str) -> str:
+    """
+    Construct commands to install NDN-DPDK from a build artifact served by another node.
+
+    :param builder_addr: control network IP address of the node running serve_artifact_cmd().
+    :param key: build key from build_artifact().
+    """
+    return install_artifact_cmd(f'http://{builder_addr}:{ARTIFACT_PORT}/{key}')
+
+
+def install_remote_artifact(node: Node, builder_addr: str, key: str) -> None:
+    """
+    Install NDN-DPDK from a build artifact served by another node, see install_remote_artifact_cmd().
+
+    :raises RuntimeError: installation failed.
+    """
+    install_artifact(node, f'http://{builder_addr}:{ARTIFACT_PORT}/{key}')
+
+
+def build_distribute(nodes: list[Node], ctrl_addrs: dict[str, str], *, repo=DEFAULT_GIT_REPO, ref='HEAD',
+                     depends_env: list[str] = [], depends_args: list[str] = [], make_env: list[str] = ['NDNDPDK_MK_RELEASE=1'],
+                     cache_dir: str | None = None) -> str:
+    """
+    Build NDN-DPDK on the first node, and install the same build on other nodes.
+    Other nodes download the artifact from the first node over the control network.
+
+    :param nodes: fablib Node instances; the first node is the builder.
+    :param ctrl_addrs: each key is a node name; each value is the node's control network IP address.
+    :returns: build key.
+    :raises RuntimeError: build failed, or installation failed on some nodes.
+
+    Other parameters are passed to build_artifact().
+    """
+    builder, others = nodes[0], nodes[1:]
+    key = build_artifact(builder, repo=repo, ref=ref, depends_env=depends_env,
+                         depends_args=depends_args, make_env=make_env, cache_dir=cache_dir)
+    if len(others) == 0:
+        return key
+    builder_addr = ctrl_addrs[builder.get_name()]
+    builder.execute(serve_artifact_cmd(builder_addr), quiet=True)
+    failed = []
+    try:
+        execute_threads = {}
+        for node in others:
+            execute_threads[node] = node.execute_thread(
+                install_remote_artifact_cmd(builder_addr, key))
+        for node, thread in execute_threads.items():
+            stdout, stderr = thread.result()
+            if ARTIFACT_INSTALLED in stdout:
+                print(f'{node.get_name()} installed build {key}')
+            else:
+                print(f'{node.get_name()} failed to install build {key}: {stderr.strip()}')
+                failed.append(node.get_name())
+    finally:
+        builder.execute(serve_artifact_stop_cmd(), quiet=True)
+    if len(failed) > 0:
+        raise RuntimeError(
+            f"NDN-DPDK build {key} not installed on {' '.join(failed)}")
+    return key
+
+
+def reboot(node: Node, *, timeout=900) -> None:
+    """
+    Reboot a node and wait until it is reachable over SSH again.
+
+    :param node: fablib Node instance.
+    :param timeout: maximum seconds to wait.
+    """
+    try:
+        node.execute('sudo systemctl reboot', quiet=True)
+    except Exception:
+        pass  # SSH session may be closed by the reboot
+    time.sleep(15)
+    deadline = time.time() + timeout
+    invalidate_facts(node)
+    while not node.test_ssh():
+        if time.time() > deadline:
+            raise TimeoutError(f'{node.get_name()} not reachable after reboot')
+        time.sleep(5)
+    node.config()
+
+
+class Provision:
+    """
+    Provisioning steps of several nodes, executed as a dependency graph.
+
+    Each step runs as soon as its dependencies are completed, so that every node proceeds as far as it can
+    independently of other nodes, and total time approaches the slowest chain of dependent steps.
+    """
+
+    def __init__(self):
+        self._steps: dict[tuple[str, str], tuple[Callable[[Node], object], Node, list[tuple[str, str]]]] = {}
+
+    def add(self, node: Node, step: str, fn: Callable[[Node], object], *, after: list[str | tuple[str, str]] = []) -> None:
+        """
+        Add a step.
+
+        :param node: fablib Node instance.
+        :param step: step name, unique within the node.
+        :param fn: function to perform the step, invoked with the node.
+        :param after: dependencies; each is either a step name on the same node, or a (node name, step name) tuple.
+        """
+        deps = [(node.get_name(), dep) if isinstance(dep, str) else dep for dep in after]
+        self._steps[(node.get_name(), step)] = (fn, node, deps)
+
+    def run(self) -> dict[tuple[str, str], float]:
+        """
+        Execute all steps and print per-step timing.
+        If a step fails, its dependents are skipped and an exception is raised after other steps complete.
+
+        :returns: each key is (node name, step name); each value is duration in seconds.
+        """
+        for key, (fn, node, deps) in self._steps.items():
+            for dep in deps:
+                if dep not in self._steps:
+                    raise KeyError(f'{key} depends on unknown step {dep}')
+
+        t0 = time.time()
+        pending = dict(self._steps)
+        running: dict[Future, tuple[str, str]] = {}
+        done: set[tuple[str, str]] = set()
+        failed: dict[tuple[str, str], str] = {}
+        durations: dict[tuple[str, str], float] = {}
+
+        def timed(fn: Callable[[Node], object], node: Node) -> float:
+            t = time.time()
+            fn(node)
+            return time.time() - t
+
+        with ThreadPoolExecutor(max_workers=max(1, len(self._steps))) as executor:
+            while len(pending) > 0 or len(running) > 0:
+                for key, (fn, node, deps) in list(pending.items()):
+                    if any(dep in failed for dep in deps):
+                        failed[key] = 'dependency failed'
+                        del pending[key]
+                    elif all(dep in done for dep in deps):
+                        print(f'{key[0]} {key[1]} START {time.time()-t0:.1f}s')
+                        running[executor.submit(timed, fn, node)] = key
+                        del pending[key]
+                if len(running) == 0:
+                    if len(pending) > 0:
+                        raise RuntimeError(
+                            f'dependency cycle among {sorted(pending)}')
+                    break
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    key = running.pop(future)
+                    try:
+                        durations[key] = future.result()
+                        done.add(key)
+                        print(f'{key[0]} {key[1]} DONE {durations[key]:.1f}s')
+                    except Exception as e:
+                        failed[key] = str(e)
+                        print(f'{key[0]} {key[1]} ERROR {e}')
+
+        print('')
+        print(f"{'node'.ljust(8)} | {'step'.ljust(16)} | {'seconds'.rjust(8)}")
+        for key in self._steps:
+            result = f'{durations[key]:.1f}' if key in durations else 'ERROR'
+            print(f'{key[0].ljust(8)} | {key[1].ljust(16)} | {result.rjust(8)}')
+        print(f'Provisioned in {time.time()-t0:.1f}s')
+        if len(failed) > 0:
+            raise RuntimeError(
+                '; '.join([f'{node} {step}: {e}' for (node, step), e in failed.items()]))
+        return durations
+
+
+def _format_cpuset(cpus: list[int]) -> str:
+    ranges: list[list[int]] = []
+    for cpu in sorted(cpus):
+        if len(ranges) > 0 and ranges[-1][1] == cpu - 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ','.join([f'{first}' if first == last else f'{first}-{last}' for first, last in ranges])
+
+
+def _parse_cpuset(value: str) -> list[int]:
+    cpus = []
+    for token in value.split(','):
+        if '-' in token:
+            first, last = token.split('-')
+            cpus += range(int(first), int(last)+1)
+        elif token != '':
+            cpus.append(int(token))
+    return cpus
+
+
+_FACTS_CMD = '''
+echo @@@links; ip -j -d link
+echo @@@addrs; ip -j addr
+echo @@@cpus; lscpu -J -e=CPU,NODE,SOCKET,CORE,ONLINE
+echo @@@pci
+for D in /sys/bus/pci/devices/*; do
+  echo $(basename $D) $(cat $D/class) $(cat $D/numa_node 2>/dev/null || echo -1) $(basename $(readlink $D/driver) 2>/dev/null || echo -)
+done
+echo @@@hugepages
+for D in /sys/devices/system/node/node*/hugepages/hugepages-*; do
+  echo $(basename $(dirname $(dirname $D))) $(basename $D) $(cat $D/nr_hugepages) $(cat $D/free_hugepages)
+done
+echo @@@svc
+for D in /etc/systemd/system/ndndpdk-svc@*.service.d; do
+  [[ -d $D ]] || continue
+  U=$(basename $D .d)
+  echo $(systemd-escape -u --instance $U) $(sed -n 's/^AllowedCPUs=//p' $D/*.conf | tail -1)
+done
+'''
+
+
+class NodeFacts:
+    """
+    Facts about a VM guest, gathered in one SSH round-trip by collect_facts().
+
+    Network links are indexed by ifname and MAC address; PCI devices are indexed by short PCI address,
+    such as '07:00.0', which is the format used in NDN-DPDK benchmark .env file.
+    """
+
+    def __init__(self, name: str, output: str):
+        self.name = name
+        sections: dict[str, str] = {}
+        for part in output.split('@@@')[1:]:
+            section, body = part.split('\n', 1)
+            sections[section.strip()] = body
+
+        self.links: dict[str, dict] = {}
+        """Links by ifname, each is an entry in `ip -j -d link` output."""
+        self.links_by_mac: dict[str, dict] = {}
+        """Links by lowercase MAC address; VLAN subinterfaces are preferred over their parent links."""
+        for link in json.loads(sections['links']):
+            self.links[link['ifname']] = link
+            mac = link.get('address', '').lower()
+            if mac not in self.links_by_mac or _is_vlan(link):
+                self.links_by_mac[mac] = link
+        self.addrs: dict[str, list[str]] = {}
+        """IP addresses by ifname, each written as address/prefixlen."""
+        for entry in json.loads(sections['addrs']):
+            self.addrs[entry['ifname']] = [
+                f"{a['local']}/{a['prefixlen']}" for a in entry.get('addr_info', [])]
+
+        self.cpu_numa: dict[int, int] = {}
+        """NUMA node of each VCPU."""
+        self.cpu_core: dict[int, tuple[int, int]] = {}
+        """(socket, core) of each VCPU; VCPUs with the same tuple are hyperthread siblings."""
+        for cpu in json.loads(sections['cpus'])['cpus']:
+            self.cpu_numa[int(cpu['cpu'])] = int(cpu.get('node') or 0)
+            self.cpu_core[int(cpu['cpu'])] = (
+                int(cpu.get('socket') or 0), int(cpu['core']))
+
+        self.pci: dict[str, dict] = {}
+        """PCI devices by short PCI address, each has class, numa, driver."""
+        for line in sections['pci'].splitlines():
+            tokens = line.split()
+            if len(tokens) == 4:
+                self.pci[tokens[0].replace('0000:', '')] = {
+                    'class': tokens[1],
+                    'numa': int(tokens[2]),
+                    'driver': None if tokens[3] == '-' else tokens[3],
+                }
+
+        self.hugepages: dict[int, dict[str, tuple[int, int]]] = {}
+        """Hugepages by NUMA node and page size such as '1048576kB', each value is (total, free)."""
+        for line in sections['hugepages'].splitlines():
+            tokens = line.split()
+            if len(tokens) == 4:
+                self.hugepages.setdefault(int(tokens[0].removeprefix('node')), {})[
+                    tokens[1].removeprefix('hugepages-')] = (int(tokens[2]), int(tokens[3]))
+
+        self.svc_cpus: dict[str, list[int]] = {}
+        """AllowedCPUs of each ndndpdk-svc@ instance that has a systemd drop-in, such as written by cpuset_cmd().
+        The drop-in is read directly, so that it is available before the ndndpdk-svc@ unit is installed."""
+        for line in sections['svc'].splitlines():
+            tokens = line.split()
+            if len(tokens) == 2:
+                self.svc_cpus[tokens[0]] = _parse_cpuset(tokens[1])
+
+    def link(self, *, ifname: str | None = None, mac: str | None = None) -> dict:
+        """
+        Find a link by ifname or MAC address.
+        """
+        link = self.links.get(ifname, None) if mac is None else self.links_by_mac.get(
+            mac.lower(), None)
+        if link is None:
+            raise KeyError(
+                f'netif {ifname or mac} not found on {self.name} `ip link` output')
+        return link
+
+    def pci_vlan(self, *, ifname: str | None = None, mac: str | None = None) -> tuple[str, int, str]:
+        """
+        Determine PCI address, VLAN ID, and MAC address of a network interface.
+        VLAN ID is 0 if the interface is not a VLAN subinterface.
+        """
+        link = self.link(ifname=ifname, mac=mac)
+        addr, vlan = link['address'], 0
+        if _is_vlan(link):
+            vlan = link['linkinfo']['info_data']['id']
+            link = self.link(ifname=link['link'])
+        return link['parentdev'].replace('0000:', ''), vlan, addr
+
+    def netif_numa(self, *, ifname: str | None = None, mac: str | None = None) -> int:
+        """
+        Determine NUMA node of a network interface, -1 if unknown.
+        """
+        pci, vlan, addr = self.pci_vlan(ifname=ifname, mac=mac)
+        return self.pci.get(pci, {}).get('numa', -1)
+
+    def ports_numa(self, pci: list[str]) -> int:
+        """
+        Determine NUMA node where most of the given PCI devices are attached, -1 if unknown.
+
+        :param pci: short PCI addresses.
+        """
+        numas = [self.pci[addr]['numa'] for addr in pci if self.pci.get(addr, {}).get('numa', -1) >= 0]
+        if len(numas) == 0:
+            return -1
+        return max(sorted(set(numas)), key=numas.count)
+
+    def siblings(self, cpu: int) -> list[int]:
+        """
+        List hyperthread siblings of a VCPU, including itself.
+        """
+        return sorted([c for c, core in self.cpu_core.items() if core == self.cpu_core[cpu]])
+
+    def benchmark_cores(self, instance: str, *, pci: list[str], n_secondary=2) -> tuple[int, list[int], list[int]]:
+        """
+        Select CPU cores of an ndndpdk-svc@ instance for NDN-DPDK benchmark .env file.
+
+        Primary NUMA node is where the PCI ports are attached; if unknown, it is the NUMA node with most CPUs in the cpuset.
+        Secondary cores are taken from other NUMA nodes if possible, otherwise from the lowest numbered CPUs.
+        Primary cores list NIC-local CPUs first, with one hyperthread of each physical core followed by their siblings,
+        so that lcores allocated from the front and from the back of the list land on different hyperthreads.
+
+        :param instance: systemd instance name, such as '10.0.0.1:3030'.
+        :param pci: short PCI addresses of network ports used by the instance.
+        :param n_secondary: number of secondary cores.
+        :returns: (NUMA_PRIMARY, CORES_PRIMARY, CORES_SECONDARY)
+        """
+        cpus = self.svc_cpus.get(instance, [])
+        if len(cpus) <= n_secondary:
+            raise KeyError(f'ndndpdk-svc@{instance} cpuset on {self.name} is missing or too small')
+        numa = self.ports_numa(pci)
+        if numa < 0:
+            numa = max(sorted(set(self.cpu_numa[cpu] for cpu in cpus)),
+                       key=lambda numa: len([cpu for cpu in cpus if self.cpu_numa[cpu] == numa]))
+
+        secondary = sorted(cpus, key=lambda cpu: (self.cpu_numa[cpu] == numa, cpu))[:n_secondary]
+        primary = [cpu for cpu in cpus if cpu not in secondary]
+        # rank of each CPU among its siblings within the cpuset: 0 for the first hyperthread, 1 for the second, etc
+        thread = {cpu: [c for c in self.siblings(cpu) if c in primary].index(cpu) for cpu in primary}
+        primary.sort(key=lambda cpu: (self.cpu_numa[cpu] != numa, thread[cpu], cpu))
+        return numa, primary, sorted(secondary)
+
+
+def _is_vlan(link: dict) -> bool:
+    linkinfo = link.get('linkinfo', {})
+    return linkinfo.get('info_kind', None) == 'vlan' and linkinfo.get('info_data', {}).get('protocol', None) == '802.1Q'
+
+
+_facts_cache = dict[str, NodeFacts]()
+
+
+def collect_facts(nodes: list[Node], *, refresh=False) -> dict[str, NodeFacts]:
+    """
+    Gather facts about several nodes concurrently.
+
+    Facts are fetched at most once per node, unless refresh is requested.
+    They should be refreshed after a reboot or a network configuration change.
+
+    :param nodes: fablib Node instances.
+    :param refresh: if True, fetch facts again.
+    :returns: each key is a node name; each value is NodeFacts.
+    """
+    execute_threads = {}
+    for node in nodes:
+        if refresh or node.get_management_ip() not in _facts_cache:
+            execute_threads[node] = node.execute_thread(_FACTS_CMD)
+    for node, thread in execute_threads.items():
+        stdout, stderr = thread.result()
+        _facts_cache[node.get_management_ip()] = NodeFacts(
+            node.get_name(), stdout)
+    return {node.get_name(): _facts_cache[node.get_management_ip()] for node in nodes}
+
+
+def get_facts(node: Node, *, refresh=False) -> NodeFacts:
+    """
+    Gather facts about a node, see collect_facts().
+    """
+    return collect_facts([node], refresh=refresh)[node.get_name()]
+
+
+def invalidate_facts(node: Node | None = None) -> None:
+    """
+    Discard cached facts about a node, or all nodes if node is None.
+    """
+    if node is None:
+        _facts_cache.clear()
+    else:
+        _facts_cache.pop(node.get_management_ip(), None)
+
+
+def cpuset_plan(node: Node, *, instances: dict[str, int], pin_cpu: dict[str, str] = {}) -> dict[str, list[int]]:
+    """
+    Determine CPU isolation placement.
+
+    Each instance with a pin_cpu component is placed on the guest NUMA node of that component, if known.
+    The unreserved OS cpuset prefers other NUMA nodes.
+    VCPUs are allocated in ascending order, so that a guest with a single NUMA node gets contiguous ranges as before.
 
     :param node: fablib Node instance.
     :param instances: each key is a systemd instance name; each value is number of CPU cores reserved for this instance.
     :param pin_cpu: each key is a systemd instance name; each value is hardware component name to identify NUMA socket to pin host CPU.
+    :returns: each key is a systemd instance name, or empty string for the unreserved OS cpuset; each value is a list of VCPUs.
     """
     demand_count = sum(instances.values())
     total_count = node.get_cores()
     assert demand_count < total_count
-    allocated = 0
-    cmds = []
+    facts = get_facts(node)
+    cpu_numa = facts.cpu_numa
+    assert len(cpu_numa) == total_count
+
+    # Determine guest NUMA node of each instance.
+    want_numa: dict[str, int] = {}
+    for a, component in pin_cpu.items():
+        if a not in instances or component is None:
+            continue
+        for intf in node.get_component(component).get_interfaces():
+            try:
+                numa = facts.netif_numa(mac=intf.get_mac())
+            except KeyError:
+                continue
+            if numa >= 0:
+                want_numa[a] = numa
+                break
+
+    free = sorted(cpu_numa)
+    placement: dict[str, list[int]] = {}
+
+    def take(n: int, rank) -> list[int]:
+        picked = sorted(free, key=lambda cpu: (rank(cpu), cpu))[:n]
+        for cpu in picked:
+            free.remove(cpu)
+        return sorted(picked)
+
+    # The unreserved OS cpuset prefers NUMA nodes not wanted by any instance.
+    placement[''] = take(total_count - demand_count,
+                         lambda cpu: cpu_numa[cpu] in want_numa.values())
+    for a, n in instances.items():
+        # Other instances stay on the NUMA node with most free VCPUs.
+        numa = want_numa.get(a, None)
+        if numa is None:
+            numa = max(sorted(set(cpu_numa.values())), key=lambda numa: len(
+                [cpu for cpu in free if cpu_numa[cpu] == numa]))
+        placement[a] = take(n, lambda cpu: cpu_numa[cpu] != numa)
+    assert len(free) == 0
+    return placement
+
+
+def cpuset_cmd(node: Node, *, instances: dict[str, int], pin_cpu: dict[str, str] = {}) -> str:
+    """
+    Construct commands to configure CPU isolation.
 
-    def alloc_cpuset(n: int) -> str:
-        nonlocal allocated
-        cpu_first = allocated
-        allocated += n
-        cpu_last = allocated - 1
-        return f'{cpu_first}-{cpu_last}'
+    :param node: fablib Node instance.
+    :param instances: each key is a systemd instance name; each value is number of CPU cores reserved for this instance.
+    :param pin_cpu: each key is a systemd instance name; each value is hardware component name to identify NUMA socket to pin host CPU.
+    """
+    placement = cpuset_plan(node, instances=instances, pin_cpu=pin_cpu)
+    print(f'{node.get_name()} cpuset placement ' + ' '.join(
+        [f"{a or 'unreserved'}={_format_cpuset(cpus)}" for a, cpus in placement.items()]))
+    cmds = []
 
     def save_unit_cpuset(unit: str, cpuset: str) -> None:
         nonlocal cmds
@@ -73,32 +732,133 @@ def cpuset_cmd(node: Node, *, instances: dict[str, int], pin_cpu: dict[str, str]
             f'echo {shlex.quote(content)} | sudo tee /etc/systemd/system/{unit}.d/cpuset.conf',
         ]
 
-    unreserved = alloc_cpuset(total_count - demand_count)
+    unreserved = _format_cpuset(placement[''])
     save_unit_cpuset('init.scope', unreserved)
     save_unit_cpuset('user.slice', unreserved)
     save_unit_cpuset('service', unreserved)
-    for a, n in instances.items():
-        unit_cpuset = alloc_cpuset(n)
+    for a in instances:
+        unit_cpuset = _format_cpuset(placement[a])
         save_unit_cpuset(
             f'ndndpdk-svc@$(systemd-escape {shlex.quote(a)}).service', unit_cpuset)
         pin_component = pin_cpu.get(a, None)
         if pin_component is not None:
-            try:
-                node.pin_cpu(pin_component, unit_cpuset)
-            except:
-                pass
-    assert allocated == total_count
+            # Node.pin_cpu() accepts one contiguous range at a time.
+            for cpu_range in unit_cpuset.split(','):
+                try:
+                    node.pin_cpu(pin_component, cpu_range if '-' in cpu_range else f'{cpu_range}-{cpu_range}')
+                except:
+                    pass
     return '\n'.join(cmds)
 
 
-def hugepages_cmd(*, size: int) -> str:
+def download_profile(node: Node, remote_dir: str, local_dir: str) -> list[str]:
     """
-    Construct commands to configure hugepages.
+    Download folded stacks and flamegraphs written by perfcap.
 
-    :param size: hugepages size in GiB.
+    :param node: fablib Node instance.
+    :param remote_dir: perfcap output directory on the node.
+    :param local_dir: local directory on JupyterLab.
+    :returns: local filenames.
     """
+    stdout, stderr = node.execute(
+        f'ls {shlex.quote(remote_dir)}/*.folded {shlex.quote(remote_dir)}/*.svg 2>/dev/null', quiet=True)
+    os.makedirs(local_dir, exist_ok=True)
+    filenames = []
+    for remote in stdout.split():
+        local = os.path.join(local_dir, f'{node.get_name()}-{os.path.basename(remote)}')
+        node.download_file(local, remote)
+        filenames.append(local)
+    return filenames
+
+
+def capture_profiles(cpus: dict[Node, list[int]], *, duration: float, local_dir: str, **kwargs) -> dict[str, list[str]]:
+    """
+    Record CPU samples with perf on several nodes at the same time, and download a flamegraph per lcore.
+    Start this while a benchmark is running, so that all nodes are sampled over the same window.
+
+    :param cpus: each key is a fablib Node instance; each value is a list of CPUs to sample.
+    :param duration: sampling duration in seconds.
+    :param local_dir: local directory on JupyterLab.
+    :param kwargs: passed to perfcap.perf_cmd().
+    :returns: each key is a node name; each value is a list of local filenames.
+    :raises RuntimeError: capture failed on some nodes.
+    """
+    # imported here, so that scripts not using profiling do not need perfcap.py uploaded
+    import perfcap
+    remote_dir = f'perf-{int(time.time())}'
+    execute_threads = {}
+    for node, node_cpus in cpus.items():
+        execute_threads[node] = node.execute_thread(perfcap.perf_cmd(
+            node_cpus, duration=duration, out_dir=remote_dir, **kwargs))
+    result = {}
+    failed = []
+    for node, thread in execute_threads.items():
+        stdout, stderr = thread.result()
+        if perfcap.PERFCAP_DONE not in stdout:
+            print(f'{node.get_name()} perf capture failed: {stderr.strip()}')
+            failed.append(node.get_name())
+            continue
+        result[node.get_name()] = download_profile(node, remote_dir, local_dir)
+    if len(failed) > 0:
+        raise RuntimeError(f"perf capture failed on {' '.join(failed)}")
+    return result
+
+
+def hugepages_boot_cmd(*plans: dict[int, int]) -> str:
+    """
+    Construct commands to reserve 1 GiB hugepages on the kernel command line.
+    Reservation takes effect after reboot, before memory becomes fragmented, so that it does not fail at runtime.
+
+    The per-node form hugepages=NUMA:N requires Linux 5.16 or later; plans covering only NUMA node 0
+    use the plain form hugepages=N, which older kernels such as Ubuntu 22.04 also accept.
+
+    :param plans: memory plans from plan_memory(), summed per NUMA node.
+    """
+    pages: dict[int, int] = {}
+    for plan in plans:
+        for numa, mib in plan.items():
+            pages[numa] = pages.get(numa, 0) + (mib + 1023) // 1024
+    if list(pages) == [0]:
+        alloc = str(pages[0])
+    else:
+        alloc = ','.join([f'{numa}:{n}' for numa, n in sorted(pages.items())])
+    content = f'GRUB_CMDLINE_LINUX_DEFAULT="$GRUB_CMDLINE_LINUX_DEFAULT default_hugepagesz=1G hugepagesz=1G hugepages={alloc}"'
     return '\n'.join([
-        'sudo dpdk-hugepages.py --clear',
-        f'while ! sudo dpdk-hugepages.py --pagesize 1G --setup {size}G; do sleep 1; done',
-        'dpdk-hugepages.py --show',
+        f'echo {shlex.quote(content)} | sudo tee /etc/default/grub.d/60-ndndpdk-hugepages.cfg',
+        'sudo update-grub',
     ])
+
+
+TRAFFICGEN_IDS = 'ABCDEGHIJKLMNOPQRSTUVWXYZ'
+"""Trafficgen identifiers in benchmark .env file; 'F' is reserved for forwarders."""
+
+
+def benchmark_topology(n_forwarders: int, n_trafficgens: int) -> dict[str, list[str]]:
+    """
+    Assign trafficgens to forwarders for NDN-DPDK benchmark.
+
+    Forwarder identifiers are 'F', 'F1', 'F2', etc; trafficgen identifiers are letters in TRAFFICGEN_IDS.
+    Trafficgens are assigned round-robin, and each forwarder needs at least two trafficgens,
+    because each trafficgen retrieves from another trafficgen on the same forwarder.
+    One forwarder and two trafficgens yield the layout expected by NDN-DPDK benchmark webapp.
+
+    :param n_forwarders: number of forwarders.
+    :param n_trafficgens: number of trafficgens.
+    :returns: each key is a forwarder identifier; each value is a list of trafficgen identifiers.
+    """
+    assert n_forwarders >= 1 and n_trafficgens >= 2 * n_forwarders
+    assert n_trafficgens <= len(TRAFFICGEN_IDS)
+    forwarders = ['F'] + [f'F{i}' for i in range(1, n_forwarders)]
+    topology = {fw: [] for fw in forwarders}
+    for i, tg in enumerate(TRAFFICGEN_IDS[:n_trafficgens]):
+        topology[forwarders[i % n_forwarders]].append(tg)
+    return topology
+
+
+def l2network_type(site_a: str, site_b: str, nic_model: str) -> str:
+    """
+    Choose FABRIC L2 network type between two NIC ports.
+
+    :returns: 'L2Bridge' within a site; otherwise 'L2STS' for NIC_Basic, 'L2PTP' for dedicated NICs.
+    """
+    return 'L2Bridge' if site_a == site_b else 'L2STS' if nic_model == 'NIC_Basic' else 'L2PTP'
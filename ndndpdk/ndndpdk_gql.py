@@ -0,0 +1,47 @@
+import json
+import time
+import urllib.request
+
+GQL_VERSION = 'query version { version { version } }'
+GQL_RESTART = 'mutation restart { shutdown(restart: true) }'
+
+
+class GqlClient:
+    """
+    Minimal GraphQL client for NDN-DPDK management API.
+    """
+
+    def __init__(self, uri: str, *, timeout=60.0):
+        self.uri = uri
+        self.timeout = timeout
+
+    def request(self, query: str, variables: dict = {}) -> dict:
+        body = json.dumps({'query': query, 'variables': variables}).encode()
+        req = urllib.request.Request(self.uri, data=body, headers={
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+        })
+        with urllib.request.urlopen(req, timeout=self.timeout) as res:
+            result = json.load(res)
+        if len(result.get('errors', [])) > 0:
+            raise RuntimeError(
+                f"{self.uri} {'; '.join([e.get('message', '') for e in result['errors']])}")
+        return result['data']
+
+    def restart(self, *, timeout=60.0) -> None:
+        """
+        Restart NDN-DPDK service and wait until it is ready for activation.
+        """
+        try:
+            self.request(GQL_RESTART)
+        except OSError:
+            pass  # service exits before responding
+        deadline = time.time() + timeout
+        while True:
+            time.sleep(1)
+            try:
+                self.request(GQL_VERSION)
+                return
+            except OSError:
+                if time.time() > deadline:
+                    raise
@@ -0,0 +1,38 @@
+BENCHMARK_FW_MEMPOOL = {
+    'DIRECT': {'capacity': 2**20-1, 'dataroom': 9146},
+    'INDIRECT': {'capacity': 2**20-1},
+}
+"""Mempool configuration of forwarders in NDN-DPDK benchmark."""
+
+BENCHMARK_TG_MEMPOOL = {
+    'DIRECT': {'capacity': 2**18-1, 'dataroom': 9146},
+    'INDIRECT': {'capacity': 2**18-1},
+    'PAYLOAD': {'capacity': 2**18-1, 'dataroom': 9146},
+}
+"""Mempool configuration of trafficgens in NDN-DPDK benchmark."""
+
+MEMPOOL_OBJ_OVERHEAD = 512
+"""Bytes per mempool object in addition to its dataroom, covering mempool header, rte_mbuf, and private area."""
+
+INSTANCE_MEM_OVERHEAD = 2048
+"""MiB per NDN-DPDK instance in addition to mempools, covering PCCT, FIB, rings, and DPDK internal allocations."""
+
+
+def plan_memory(activate: dict, *, numa=0, overhead=INSTANCE_MEM_OVERHEAD) -> dict[int, int]:
+    """
+    Compute hugepage memory needed by an NDN-DPDK activation, and set eal.memPerNuma accordingly.
+
+    Each mempool needs capacity * (dataroom + MEMPOOL_OBJ_OVERHEAD) bytes.
+    The total is rounded up to whole 1 GiB hugepages.
+
+    :param activate: activation parameters, modified in place.
+    :param numa: NUMA node where the instance runs.
+    :param overhead: memory in MiB needed in addition to mempools.
+    :returns: each key is a NUMA node; each value is memory in MiB, multiple of 1024.
+    """
+    mempool_bytes = sum([cfg.get('capacity', 0) * (cfg.get('dataroom', 0) + MEMPOOL_OBJ_OVERHEAD)
+                         for cfg in activate.get('mempool', {}).values()])
+    mib = mempool_bytes // 2**20 + overhead
+    mib = (mib + 1023) // 1024 * 1024
+    activate.setdefault('eal', {})['memPerNuma'] = {str(numa): mib}
+    return {numa: mib}
@@ -0,0 +1,88 @@
+import argparse
+import os
+import shlex
+import signal
+import subprocess
+
+FLAMEGRAPH_GIT = 'https://github.com/brendangregg/FlameGraph.git'
+FLAMEGRAPH_DIR = '~/FlameGraph'
+PERFCAP_DONE = 'PERFCAP-DONE'
+
+
+def parse_cpus(value: str) -> list[int]:
+    cpus = []
+    for token in value.split(','):
+        if '-' in token:
+            first, last = token.split('-')
+            cpus += range(int(first), int(last)+1)
+        elif token != '':
+            cpus.append(int(token))
+    return cpus
+
+
+def perf_cmd(cpus: list[int], *, duration: float, out_dir: str, freq=999, call_graph='fp') -> str:
+    """
+    Construct commands to record CPU samples with perf and render a flamegraph per lcore.
+
+    Output directory contains cpuN.folded folded stacks and cpuN.svg flamegraph for each CPU.
+    The commands run in a subshell that stops at the first error, such as perf record failure;
+    PERFCAP_DONE is printed upon success.
+
+    :param cpus: CPUs to sample, typically lcores of an NDN-DPDK instance.
+    :param duration: sampling duration in seconds.
+    :param out_dir: output directory.
+    :param freq: sampling frequency in Hz.
+    :param call_graph: perf call graph mode; 'fp' is cheap but truncates stacks in code built without frame pointers,
+                       'dwarf' gives full stacks at higher overhead.
+    """
+    out = shlex.quote(out_dir)
+    return '\n'.join([
+        '(',
+        'set -eo pipefail',
+        f'mkdir -p {out}',
+        f'[[ -d {FLAMEGRAPH_DIR} ]] || git clone -q --depth=1 {FLAMEGRAPH_GIT} {FLAMEGRAPH_DIR}',
+        f"sudo perf record -q -F {freq} --call-graph {call_graph} -C {','.join([str(cpu) for cpu in cpus])} -o {out}/perf.data -- sleep {duration}",
+        f"for CPU in {' '.join([str(cpu) for cpu in cpus])}; do",
+        f'  sudo perf script -i {out}/perf.data --cpu $CPU | {FLAMEGRAPH_DIR}/stackcollapse-perf.pl >{out}/cpu$CPU.folded',
+        f'  {FLAMEGRAPH_DIR}/flamegraph.pl --title "cpu$CPU" {out}/cpu$CPU.folded >{out}/cpu$CPU.svg',
+        'done',
+        f'sudo rm -f {out}/perf.data',
+        f'echo {PERFCAP_DONE}',
+        ')',
+    ])
+
+
+def start(cpus: list[int], *, duration: float, out_dir: str, **kwargs) -> subprocess.Popen:
+    """
+    Start perf_cmd() on the local machine in background.
+    The process exits with non-zero code if the capture failed.
+    """
+    return subprocess.Popen(['bash', '-c', perf_cmd(cpus, duration=duration, out_dir=out_dir, **kwargs)],
+                            stdout=subprocess.DEVNULL, start_new_session=True)
+
+
+def stop(proc: subprocess.Popen) -> None:
+    """
+    Terminate a capture started by start(), including perf running under sudo.
+    """
+    if proc.poll() is None:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Record per-lcore CPU samples with perf and render flamegraphs.')
+    parser.add_argument('--cpus', required=True,
+                        help='CPUs to sample, such as 6-23')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='sampling duration in seconds')
+    parser.add_argument('--out-dir', default='perf',
+                        help='output directory')
+    parser.add_argument('--call-graph', default='fp', choices=['fp', 'dwarf'],
+                        help='perf call graph mode')
+    args = parser.parse_args()
+    code = start(parse_cpus(args.cpus), duration=args.duration,
+                 out_dir=args.out_dir, call_graph=args.call_graph).wait()
+    if code != 0:
+        raise SystemExit(f'perf capture failed with exit code {code}')
@@ -0,0 +1,207 @@
+import argparse
+import csv
+import importlib.util
+import threading
+import time
+from array import array
+
+from ndndpdk_gql import GqlClient
+
+FACE_FIELDS = ['rxFrames', 'rxOctets', 'rxInterests', 'rxData', 'rxNacks',
+               'txFrames', 'txOctets', 'txInterests', 'txData', 'txNacks']
+FWD_FIELDS = ['nInterests', 'nData', 'nNacks',
+              'nNoFibMatch', 'nDupNonce', 'nSgNoFwd', 'nNackMismatch']
+GQL_FACE_COUNTERS = f"query faceCounters {{ faces {{ id counters {{ {' '.join(FACE_FIELDS)} }} }} }}"
+GQL_FWD_COUNTERS = f"query fwdCounters {{ fwdp {{ fwds {{ id counters {{ {' '.join(FWD_FIELDS)} }} }} }} }}"
+PERCENTILES = [50, 90, 99]
+
+
+class RingSeries:
+    """
+    Fixed-capacity time series of cumulative counters, backed by compact arrays.
+    When full, the oldest samples are overwritten.
+    """
+
+    def __init__(self, fields: list[str], capacity: int):
+        self.fields = fields
+        self.capacity = capacity
+        self._t = array('d', [0.0]) * capacity
+        self._v = {field: array('Q', [0]) * capacity for field in fields}
+        self._next = 0
+        self.count = 0
+
+    def append(self, t: float, counters: dict[str, int]) -> None:
+        self._t[self._next] = t
+        for field in self.fields:
+            self._v[field][self._next] = int(counters.get(field, 0))
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _order(self) -> range:
+        first = (self._next - self.count) % self.capacity
+        return range(first, first + self.count)
+
+    def times(self) -> list[float]:
+        return [self._t[i % self.capacity] for i in self._order()]
+
+    def values(self, field: str) -> list[int]:
+        v = self._v[field]
+        return [v[i % self.capacity] for i in self._order()]
+
+    def rates(self, field: str, *, scale=1.0) -> list[float]:
+        """
+        Compute per-second rate between consecutive samples.
+        A counter that went backwards, such as after a face is recreated, yields zero.
+        """
+        t, v = self.times(), self.values(field)
+        return [max(0, v[i] - v[i-1]) * scale / (t[i] - t[i-1]) for i in range(1, len(t))]
+
+
+def percentile(values: list[float], p: float) -> float:
+    if len(values) == 0:
+        return float('nan')
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    i = int(k)
+    return values[i] + (values[min(i+1, len(values)-1)] - values[i]) * (k - i)
+
+
+class Sampler:
+    """
+    Poll face and forwarding thread counters of an NDN-DPDK forwarder at a fixed interval.
+    Each face or forwarding thread gets its own RingSeries.
+    """
+
+    def __init__(self, client: GqlClient, *, interval=0.1, capacity=36000, want_fwds=True):
+        self.client = client
+        self.interval = interval
+        self.capacity = capacity
+        self.want_fwds = want_fwds
+        self.faces: dict[str, RingSeries] = {}
+        self.fwds: dict[str, RingSeries] = {}
+        self.n_errors = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def sample_once(self) -> None:
+        data = self.client.request(GQL_FACE_COUNTERS)
+        t = time.time()
+        for face in data['faces']:
+            self.faces.setdefault(face['id'], RingSeries(
+                FACE_FIELDS, self.capacity)).append(t, face['counters'])
+        if self.want_fwds:
+            data = self.client.request(GQL_FWD_COUNTERS)
+            t = time.time()
+            for fwd in data['fwdp']['fwds']:
+                self.fwds.setdefault(fwd['id'], RingSeries(
+                    FWD_FIELDS, self.capacity)).append(t, fwd['counters'])
+
+    def _loop(self) -> None:
+        # sample times are aligned to the interval grid, so that a slow request does not shift later samples
+        next_at = time.time()
+        while not self._stop.is_set():
+            try:
+                self.sample_once()
+            except Exception:
+                self.n_errors += 1
+            next_at += self.interval
+            self._stop.wait(max(0, next_at - time.time()))
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """
+        Compute rate percentiles of each face.
+
+        :returns: each key is a face ID; each value maps a metric such as 'rxPps_p50' or 'txBps_p99' to its value.
+        """
+        result = {}
+        for id, series in self.faces.items():
+            metrics = {}
+            for name, field, scale in [('rxPps', 'rxFrames', 1), ('rxBps', 'rxOctets', 8),
+                                       ('txPps', 'txFrames', 1), ('txBps', 'txOctets', 8)]:
+                rates = series.rates(field, scale=scale)
+                for p in PERCENTILES:
+                    metrics[f'{name}_p{p}'] = percentile(rates, p)
+            result[id] = metrics
+        return result
+
+    def export_csv(self, filename: str) -> None:
+        """
+        Write every sample as a row: kind, id, time, and cumulative counters.
+        """
+        with open(filename, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['kind', 'id', 'time'] + FACE_FIELDS + FWD_FIELDS)
+            for kind, group, fields in [('face', self.faces, FACE_FIELDS), ('fwd', self.fwds, FWD_FIELDS)]:
+                for id, series in group.items():
+                    columns = [series.values(field) for field in fields]
+                    for i, t in enumerate(series.times()):
+                        row = dict(zip(fields, [c[i] for c in columns]))
+                        w.writerow([kind, id, f'{t:.6f}'] + [row.get(field, '')
+                                   for field in FACE_FIELDS + FWD_FIELDS])
+
+    def export_npz(self, filename: str) -> None:
+        """
+        Write each series as arrays named like 'face_<id>_time' and 'face_<id>_rxFrames'.
+        Requires numpy.
+        """
+        import numpy as np
+        arrays = {}
+        for kind, group in [('face', self.faces), ('fwd', self.fwds)]:
+            for id, series in group.items():
+                arrays[f'{kind}_{id}_time'] = np.array(series.times())
+                for field in series.fields:
+                    arrays[f'{kind}_{id}_{field}'] = np.array(
+                        series.values(field), dtype=np.uint64)
+        np.savez_compressed(filename, **arrays)
+
+
+def print_summary(summary: dict[str, dict[str, float]]) -> None:
+    print(f"{'face'.rjust(6)} | " + ' | '.join([f"{f'{name} p{p}'.rjust(14)}" for name in [
+          'rx Mpps', 'rx Gbps', 'tx Mpps', 'tx Gbps'] for p in PERCENTILES]))
+    for id, metrics in summary.items():
+        cells = []
+        for name, scale in [('rxPps', 1e6), ('rxBps', 1e9), ('txPps', 1e6), ('txBps', 1e9)]:
+            cells += [f'{metrics[f"{name}_p{p}"] / scale:14.3f}' for p in PERCENTILES]
+        print(f'{str(id).rjust(6)} | ' + ' | '.join(cells))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Sample NDN-DPDK face and forwarding thread counters.')
+    parser.add_argument('--gqlserver', default='http://127.0.0.1:3030/',
+                        help='NDN-DPDK forwarder GraphQL endpoint')
+    parser.add_argument('--interval', type=float, default=0.1,
+                        help='sampling interval in seconds')
+    parser.add_argument('--duration', type=float, default=60,
+                        help='sampling duration in seconds')
+    parser.add_argument('--no-fwds', action='store_true',
+                        help='do not sample forwarding thread counters')
+    parser.add_argument('--csv', help='save samples as CSV file')
+    parser.add_argument('--npz', help='save samples as NPZ file, requires numpy')
+    args = parser.parse_args()
+    if args.npz is not None and importlib.util.find_spec('numpy') is None:
+        parser.error('--npz requires numpy')
+
+    sampler = Sampler(GqlClient(args.gqlserver), interval=args.interval,
+                      capacity=int(args.duration / args.interval) + 2, want_fwds=not args.no_fwds)
+    sampler.start()
+    time.sleep(args.duration)
+    sampler.stop()
+    if args.csv is not None:
+        sampler.export_csv(args.csv)
+    if args.npz is not None:
+        sampler.export_npz(args.npz)
+    print_summary(sampler.summary())
+    if sampler.n_errors > 0:
+        print(f'{sampler.n_errors} samples failed')
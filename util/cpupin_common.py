@@ -1,7 +1,8 @@
 import itertools
-import random
+import json
 import shlex
 import time
+from collections import defaultdict
 from collections.abc import Iterable
 
 from fabrictestbed_extensions.fablib.node import Node
@@ -49,115 +50,223 @@ def _save_unit_cpuset(unit: str, cpuset: Iterable[int]) -> Iterable[str]:
     yield f'echo {shlex.quote(content)} >/etc/systemd/system/{unit}.d/cpuset.conf'
 
 
-def pin_vcpu_to_socket(node: Node, online: dict[int, int], offline: list[int], *, quiet=False):
+class HostTopology:
     """
-    Assign VCPUs to physical cores on specific NUMA sockets.
+    CPU topology of a host machine, parsed from cpuinfo document.
+    """
+
+    def __init__(self, host: str, cpu_info: dict):
+        """
+        Args:
+            host: host machine name.
+            cpu_info: cpuinfo document from Node.get_cpu_info(), containing host and instance sections.
+        """
+        cpu_info_host = cpu_info[host]
+        self.host = host
+
+        # Determine how many physical cores are present on the host machine.
+        # Since hyperthreading is enabled, this would be half of the reported logical cores.
+        host_lcore_count = int(cpu_info_host["CPU(s):"])
+        assert host_lcore_count % 2 == 0
+        self.pcore_count = host_lcore_count // 2
+        """Number of physical cores on the host machine."""
+
+        # Determine which physical cores belong to each NUMA socket.
+        self.socket_pcores = dict[int, list[int]]()
+        """Mapping from NUMA socket ID to its physical cores, i.e. lower logical core of each pair."""
+        socket = 0
+        while f"NUMA node{socket} CPU(s):" in cpu_info_host:
+            # Logical cores within a NUMA socket typically show up as two disjoint ranges, in which
+            # each physical core has one logical core in the lower range and another in the upper range.
+            # We assert this assumption holds.
+            socket_lcore = _parse_cpuset(
+                cpu_info_host[f"NUMA node{socket} CPU(s):"])
+            assert len(socket_lcore) % 2 == 0
+            socket_pcore_count = len(socket_lcore) // 2
+            socket_pcore = socket_lcore[:socket_pcore_count]
+            assert socket_pcore == [
+                lc-self.pcore_count for lc in socket_lcore[socket_pcore_count:]]
+            self.socket_pcores[socket] = socket_pcore
+            socket += 1
+
+        self.pinned = set([int(lcore)
+                          for lcore in cpu_info_host["pinned_cpus"]])
+        """Pinned / used logical cores."""
+
+        self.instances = dict[str, dict[int, list[int]]]()
+        """Mapping from instance name to VCPU ID to CPU affinity of that VCPU."""
+        for instance, rows in cpu_info.items():
+            if instance == host or not isinstance(rows, list):
+                continue
+            affinity = dict[int, list[int]]()
+            for row in rows:
+                affinity[int(row["VCPU"])] = _parse_cpuset(
+                    row["CPU Affinity"])
+            self.add_instance(instance, affinity)
+
+    def __repr__(self) -> str:
+        return f"HostTopology(host={self.host}, pcore_count={self.pcore_count}, socket_pcores={self.socket_pcores}, pinned={sorted(self.pinned)}, instances={self.instances})"
+
+    def add_instance(self, instance: str, affinity: dict[int, list[int]]) -> None:
+        """
+        Record CPU affinity of an instance, merging with existing records.
+        A VCPU whose affinity contains a single logical core is considered pinned to that logical core.
+        """
+        self.instances.setdefault(instance, {}).update(affinity)
+        for vcpu_affinity in affinity.values():
+            if len(vcpu_affinity) == 1:
+                self.pinned.add(vcpu_affinity[0])
+
+    def sibling(self, pcore: int) -> int:
+        """
+        Return the upper logical core of a physical core.
+        """
+        return pcore + self.pcore_count
+
+    def free_pcores(self) -> dict[int, list[int]]:
+        """
+        Gather unused physical cores, grouped by NUMA socket.
+
+        If either logical core is used, the physical cores is considered used.
+        The first physical core of each NUMA socket is considered as being used by the kernel.
+        """
+        host_pcore_by_numa = dict[int, list[int]]()
+        for socket, socket_pcore in self.socket_pcores.items():
+            host_pcore_by_numa[socket] = [
+                pcore for pcore in socket_pcore[1:]
+                if pcore not in self.pinned and self.sibling(pcore) not in self.pinned]
+        return host_pcore_by_numa
+
+
+_host_topology_cache = dict[str, HostTopology]()
+
+
+def get_host_topology(node: Node, *, refresh=False) -> HostTopology:
+    """
+    Retrieve CPU topology of the host machine of a node.
+
+    cpuinfo is fetched at most once per host machine, unless refresh is requested.
 
     Args:
         node: existing Node instance.
-        online: mapping from online VCPU to NUMA socket.
-                Key is VCPU ID.
-                Value is NUMA socket ID, or -1 for any.
-        offline: list of VCPUs to set offline.
-        quiet: if False, suppress console output.
+        refresh: if True, fetch cpuinfo again.
     """
+    host = node.get_host()
+    topology = _host_topology_cache.get(host, None)
+    if refresh or topology is None:
+        topology = HostTopology(host, node.get_cpu_info())
+        _host_topology_cache[host] = topology
+    return topology
 
-    # Retrieve cpuinfo document.
-    cpu_info = node.get_cpu_info()
-    cpu_info_host = cpu_info[node.get_host()]
-    cpu_info_instance = cpu_info[node.get_instance_name()]
 
-    if not quiet:
-        print(f"---- cpuinfo for host {node.get_host()} ----")
-        print(f"{cpu_info_host}\n")
-        print(f"---- cpuinfo for instance {node.get_instance_name()} ----")
-        print(f"{cpu_info_instance}\n")
-
-    # Determine how many physical cores are present on the host machine.
-    # Since hyperthreading is enabled, this would be half of the reported logical cores.
-    host_lcore_count = int(cpu_info_host["CPU(s):"])
-    assert host_lcore_count % 2 == 0
-    host_pcore_count = host_lcore_count // 2
-
-    # Gather a list of pinned / used logical cores.
-    host_lcore_pinned = set([int(lcore)
-                            for lcore in cpu_info_host["pinned_cpus"]])
-    vcpu_unreserved = set[int]()
-    for row in cpu_info_instance:
-        vcpu_affinity = _parse_cpuset(row["CPU Affinity"])
-        if len(vcpu_affinity) == 1:
-            host_lcore_pinned.add(vcpu_affinity[0])
-        vcpu_unreserved.add(int(row["VCPU"]))
-
-    # Determine how many NUMA sockets are present on the host machine.
-    # Gather a list of unused physical cores, grouped by NUMA socket.
-    host_socket_count = 0
-    host_pcore_by_numa = dict[int, list[int]]()
-    for socket in range(0, 32):
-        host_socket_count = socket
+def invalidate_host_topology(host: str | None = None) -> None:
+    """
+    Discard cached CPU topology of a host machine, or all host machines if host is None.
+    """
+    if host is None:
+        _host_topology_cache.clear()
+    else:
+        _host_topology_cache.pop(host, None)
+
+
+def _component_sockets(node: Node) -> set[int]:
+    """
+    Determine NUMA sockets of hardware components, such as NIC and NVMe, attached to a node.
+    """
+    sockets = set[int]()
+    for component in node.get_components():
         try:
-            socket_lcore_cpuset = cpu_info_host[f"NUMA node{socket} CPU(s):"]
-        except KeyError:
-            break
+            sockets.add(int(component.get_numa_node()))
+        except (TypeError, ValueError):
+            pass
+    return sockets
 
-        # Logical cores within a NUMA socket typically show up as two disjoint ranges, in which
-        # each physical core has one logical core in the lower range and another in the upper range.
-        # We assert this assumption holds.
-        socket_lcore = _parse_cpuset(socket_lcore_cpuset)
-        assert len(socket_lcore) % 2 == 0
-        socket_pcore_count = len(socket_lcore) // 2
-        socket_pcore = socket_lcore[:socket_pcore_count]
-        assert socket_pcore == [
-            lc-host_pcore_count for lc in socket_lcore[socket_pcore_count:]]
-
-        # Determine unused physical cores on this NUMA socket.
-        # If either logical core is used, the physical cores is considered used.
-        # The first physical core is considered as being used by the kernel.
-        socket_pcore = set(socket_pcore[1:])
-        for lcore in host_lcore_pinned:
-            socket_pcore.discard(lcore)
-            socket_pcore.discard(lcore - host_pcore_count)
-        host_pcore_by_numa[socket] = list(socket_pcore)
 
-    if not quiet:
-        print(f"---- unused physical cores by NUMA socket ----")
-        print(f"{host_pcore_by_numa}\n")
+def _take_adjacent(free: list[int], count: int) -> list[int]:
+    """
+    Take physical cores from a sorted list of unused physical cores, preferring adjacent cores.
+
+    If a run of consecutive cores can satisfy the demand, the shortest such run is used, so that
+    longer runs are left for later demands. Otherwise, the longest runs are combined.
+    """
+    runs: list[list[int]] = []
+    for pcore in free:
+        if len(runs) > 0 and runs[-1][-1] == pcore - 1:
+            runs[-1].append(pcore)
+        else:
+            runs.append([pcore])
+
+    fitting = [run for run in runs if len(run) >= count]
+    if len(fitting) > 0:
+        picked = min(fitting, key=len)[:count]
+    else:
+        picked = []
+        for run in sorted(runs, key=len, reverse=True):
+            picked += run[:count-len(picked)]
+    assert len(picked) == count, "insufficient unused physical cores on NUMA socket"
+
+    for pcore in picked:
+        free.remove(pcore)
+    return sorted(picked)
+
+
+def _plan_node(node: Node, online: dict[int, int | str], offline: list[int],
+               topology: HostTopology, host_pcore_by_numa: dict[int, list[int]], *, quiet: bool) -> list[dict[str, str]]:
+    """
+    Assign physical cores to one node, consuming them from host_pcore_by_numa.
+
+    Returns vcpu_cpu_map for cpupin POA.
+    """
 
     # Validate user input.
     assert len(online) <= len(offline)
-    assert max([socket for socket in online.values()]) < host_socket_count
 
-    # Prepare POA.
-    if not quiet:
-        print("---- CPU assignments ----")
+    # Resolve desired NUMA socket of each online VCPU.
+    component_sockets = _component_sockets(node)
+    vcpus_by_socket = defaultdict[int, list[int]](list)
+    vcpus_any = list[int]()
+    for vcpu0, socket in sorted(online.items()):
+        if isinstance(socket, str):
+            socket = int(node.get_component(socket).get_numa_node())
+        if socket < 0:
+            vcpus_any.append(vcpu0)
+            continue
+        assert socket in host_pcore_by_numa, f"NUMA socket {socket} does not exist"
+        vcpus_by_socket[socket].append(vcpu0)
+
+    # When desired socket is any, keep these VCPUs together on one NUMA socket.
+    # Prefer a socket that fits all of them, then a socket of attached hardware components,
+    # then the least utilized socket, then the lowest socket ID.
+    if len(vcpus_any) > 0:
+        def any_socket_rank(socket: int) -> tuple:
+            n_free = len(host_pcore_by_numa[socket]) - \
+                len(vcpus_by_socket[socket])
+            return (n_free < len(vcpus_any), socket not in component_sockets, -n_free, socket)
+        socket = min(host_pcore_by_numa, key=any_socket_rank)
+        vcpus_by_socket[socket] += vcpus_any
+
+    # Pick adjacent physical cores and pair with offline VCPUs.
     vcpu_offline = offline[:]
     vcpu_cpu_map: list[dict[str, str]] = []
-    for vcpu0, socket in online.items():
-        # When desired socket is any, pick the least utilized NUMA socket.
-        if socket < 0:
-            socket = max(host_pcore_by_numa.items(),
-                         key=lambda item: len(item[1]))[0]
-
-        # Pick a physical core and pair with an offline VCPU.
-        pcore = random.choice(host_pcore_by_numa[socket])
-        host_pcore_by_numa[socket].remove(pcore)
-        lcore0, lcore1 = pcore, pcore + host_pcore_count
-        vcpu1 = vcpu_offline.pop(0)
-        if not quiet:
-            print(
-                f"physical={pcore}, VCPU-online={vcpu0}, VCPU-offline={vcpu1}")
+    for socket, vcpus in sorted(vcpus_by_socket.items()):
+        pcores = _take_adjacent(host_pcore_by_numa[socket], len(vcpus))
+        for vcpu0, pcore in zip(sorted(vcpus), pcores):
+            lcore0, lcore1 = pcore, topology.sibling(pcore)
+            vcpu1 = vcpu_offline.pop(0)
+            if not quiet:
+                print(
+                    f"node={node.get_name()}, socket={socket}, physical={pcore}, VCPU-online={vcpu0}, VCPU-offline={vcpu1}")
 
-        # Map VCPUs as reserved.
-        vcpu_unreserved.remove(vcpu0)
-        vcpu_unreserved.remove(vcpu1)
+            # Map its two logical cores to one online VCPU and one offline VCPU.
+            vcpu_cpu_map.append({"vcpu": f"{vcpu0}", "cpu": f"{lcore0}"})
+            vcpu_cpu_map.append({"vcpu": f"{vcpu1}", "cpu": f"{lcore1}"})
+    return vcpu_cpu_map
 
-        # Map its two logical cores to one online VCPU and one offline VCPU.
-        vcpu_cpu_map.append({"vcpu": f"{vcpu0}", "cpu": f"{lcore0}"})
-        vcpu_cpu_map.append({"vcpu": f"{vcpu1}", "cpu": f"{lcore1}"})
 
+def _apply_node(node: Node, online: dict[int, int | str], offline: list[int],
+                vcpu_cpu_map: list[dict[str, str]], vcpu_unreserved: set[int], *, quiet: bool) -> None:
     if not quiet:
-        print("")
-        print(f"---- cpupin POA ----")
+        print(f"---- cpupin POA for {node.get_name()} ----")
         print(f"{vcpu_cpu_map}\n")
 
     # Issue POA.
@@ -165,6 +274,8 @@ def pin_vcpu_to_socket(node: Node, online: dict[int, int], offline: list[int], *
     assert poa_reply == "Success"
 
     # Install systemd service to enable/disable VCPUs and set CPU isolation.
+    vcpu_unreserved = vcpu_unreserved.difference(
+        [int(m["vcpu"]) for m in vcpu_cpu_map])
     sudo_commands = "\n".join(itertools.chain(
         _save_chcpu(online, offline),
         _save_unit_cpuset("init.scope", vcpu_unreserved),
@@ -175,11 +286,232 @@ def pin_vcpu_to_socket(node: Node, online: dict[int, int], offline: list[int], *
     node.execute(
         f"sudo bash -c {shlex.quote(sudo_commands)}", display=not quiet)
 
-    # Refresh slice information and display instance cpuinfo.
+
+def _verify_node(node: Node, vcpu_cpu_map: list[dict[str, str]], *, timeout: float, quiet: bool) -> dict:
+    """
+    Poll instance CPU affinity with bounded exponential backoff, until every VCPU in vcpu_cpu_map
+    is pinned to its assigned logical core.
+
+    Returns:
+        Verification report, containing node name, elapsed seconds, number of polls,
+        and mapping from VCPU ID to assigned logical core and observed CPU affinity.
+
+    Raises:
+        RuntimeError: CPU affinity does not match after timeout.
+    """
+    expected = {int(m["vcpu"]): int(m["cpu"]) for m in vcpu_cpu_map}
+    t0 = time.monotonic()
+    interval = 0.5
+    polls = 0
+    while True:
+        polls += 1
+        topology = get_host_topology(node, refresh=True)
+        affinity = topology.instances.get(node.get_instance_name(), {})
+        mismatch = [vcpu for vcpu, cpu in expected.items()
+                    if affinity.get(vcpu, None) != [cpu]]
+        elapsed = time.monotonic() - t0
+        if len(mismatch) == 0 or elapsed + interval > timeout:
+            break
+        time.sleep(interval)
+        interval = min(interval * 2, 8)
+
+    report = {
+        "node": node.get_name(),
+        "elapsed": elapsed,
+        "polls": polls,
+        "vcpus": {vcpu: {"cpu": cpu, "affinity": affinity.get(vcpu, None)} for vcpu, cpu in expected.items()},
+    }
     if not quiet:
-        time.sleep(4)
-        node.get_slice().update()
-        cpu_info = node.get_cpu_info()
-        cpu_info_instance = cpu_info[node.get_instance_name()]
-        print(
-            f"---- final cpuinfo for instance {node.get_instance_name()} ----\n{cpu_info_instance}\n")
+        print(f"---- CPU affinity verification for {node.get_name()} ----")
+        print(f"{report}\n")
+    if len(mismatch) > 0:
+        raise RuntimeError(
+            f"cpupin not honored on {node.get_name()} after {elapsed:.1f}s: " +
+            ", ".join([f"VCPU {vcpu} affinity {affinity.get(vcpu, None)} expected [{expected[vcpu]}]" for vcpu in mismatch]))
+    return report
+
+
+def pin_vcpu_to_socket_batch(requests: dict[Node, tuple[dict[int, int | str], list[int]]], *,
+                             verify_timeout=60.0, quiet=False) -> dict[str, dict]:
+    """
+    Assign VCPUs of several nodes to physical cores on specific NUMA sockets.
+
+    Nodes on the same host machine are planned together, so that they never compete for the same physical core.
+    Placement is deterministic: each node takes adjacent physical cores, in the order of node names.
+
+    Args:
+        requests: mapping from existing Node instance to (online, offline) arguments,
+                  as described in pin_vcpu_to_socket.
+        verify_timeout: how long to wait for CPU affinity to take effect, in seconds.
+        quiet: if False, suppress console output.
+
+    Returns:
+        Mapping from node name to verification report.
+
+    Raises:
+        RuntimeError: CPU affinity does not take effect within verify_timeout.
+    """
+
+    # Group nodes by host machine.
+    nodes_by_host = defaultdict[str, list[Node]](list)
+    for node in sorted(requests, key=lambda node: node.get_name()):
+        nodes_by_host[node.get_host()].append(node)
+
+    plans = dict[Node, tuple[HostTopology, list[dict[str, str]], set[int]]]()
+    for host, nodes in nodes_by_host.items():
+        # Retrieve host topology, fetching cpuinfo only if it is not cached.
+        topology = get_host_topology(nodes[0])
+        if not quiet:
+            print(f"---- topology of host {host} ----")
+            print(f"{topology}\n")
+
+        host_pcore_by_numa = topology.free_pcores()
+        if not quiet:
+            print(f"---- unused physical cores by NUMA socket ----")
+            print(f"{host_pcore_by_numa}\n")
+            print("---- CPU assignments ----")
+
+        for node in nodes:
+            online, offline = requests[node]
+            vcpu_cpu_map = _plan_node(
+                node, online, offline, topology, host_pcore_by_numa, quiet=quiet)
+            vcpus = set(topology.instances.get(
+                node.get_instance_name(), range(node.get_cores())))
+            plans[node] = (topology, vcpu_cpu_map, vcpus)
+        if not quiet:
+            print("")
+
+    for node, (topology, vcpu_cpu_map, vcpu_unreserved) in plans.items():
+        online, offline = requests[node]
+        _apply_node(node, online, offline, vcpu_cpu_map,
+                    vcpu_unreserved, quiet=quiet)
+        # Record new pins in cached topology, so that subsequent placements avoid these cores.
+        topology.add_instance(node.get_instance_name(), {
+            int(m["vcpu"]): [int(m["cpu"])] for m in vcpu_cpu_map})
+
+    # Verify that CPU affinity has taken effect.
+    reports = dict[str, dict]()
+    for node, (topology, vcpu_cpu_map, vcpu_unreserved) in plans.items():
+        reports[node.get_name()] = _verify_node(
+            node, vcpu_cpu_map, timeout=verify_timeout, quiet=quiet)
+    return reports
+
+
+def pin_vcpu_to_socket(node: Node, online: dict[int, int | str], offline: list[int], *,
+                       verify_timeout=60.0, quiet=False) -> dict:
+    """
+    Assign VCPUs to physical cores on specific NUMA sockets.
+
+    Args:
+        node: existing Node instance.
+        online: mapping from online VCPU to NUMA socket.
+                Key is VCPU ID.
+                Value is NUMA socket ID, or component name to use its NUMA socket,
+                or -1 for any (preferring NUMA sockets of attached components).
+        offline: list of VCPUs to set offline.
+        verify_timeout: how long to wait for CPU affinity to take effect, in seconds.
+        quiet: if False, suppress console output.
+
+    Returns:
+        Verification report, see pin_vcpu_to_socket_batch.
+    """
+    return pin_vcpu_to_socket_batch({node: (online, offline)}, verify_timeout=verify_timeout, quiet=quiet)[node.get_name()]
+
+
+_JITTER_FALLBACK = """
+import json, os, sys, time
+vcpu, interval, duration, max_us = [int(a) for a in sys.argv[1:]]
+os.sched_setaffinity(0, [vcpu])
+hist = [0] * (max_us + 1)
+t = time.monotonic_ns()
+t_end = t + duration * 10**9
+while t < t_end:
+    t += interval * 1000
+    time.sleep(max(0, t - time.monotonic_ns()) / 1e9)
+    hist[min((time.monotonic_ns() - t) // 1000, max_us)] += 1
+print(json.dumps({"vcpu": vcpu, "hist": hist}))
+"""
+
+
+def _percentile(hist: dict[int, int], p: float) -> int:
+    total = sum(hist.values())
+    rank = total * p / 100
+    count = 0
+    for bucket in sorted(hist):
+        count += hist[bucket]
+        if count >= rank:
+            return bucket
+    return -1
+
+
+def measure_vcpu_jitter(node: Node, offline: list[int], *, duration=30, interval=200, max_us=1000,
+                        percentiles=(50, 90, 99, 99.9, 99.99), quiet=False) -> dict[int, dict]:
+    """
+    Measure timer latency on each online and unreserved VCPU, to quantify noisy neighbor interference
+    on pinned physical cores.
+
+    cyclictest from rt-tests package is used if installed on the node; otherwise, a Python timer loop
+    is run on each VCPU. The probe runs in its own systemd scope, because user.slice of the SSH session
+    is restricted to unreserved VCPUs after pin_vcpu_to_socket.
+
+    Args:
+        node: existing Node instance, normally after pin_vcpu_to_socket.
+        offline: list of offline VCPUs, which are skipped.
+        duration: measurement duration in seconds.
+        interval: timer interval in microseconds.
+        max_us: histogram upper bound in microseconds; longer latencies are counted in the last bucket.
+        percentiles: latency percentiles to report.
+        quiet: if False, suppress console output.
+
+    Returns:
+        Mapping from VCPU ID to its report, containing sample count, latency percentiles in microseconds,
+        and latency histogram that maps microseconds to sample count.
+
+    Raises:
+        RuntimeError: the probe did not produce samples for every VCPU.
+    """
+    vcpus = [vcpu for vcpu in range(node.get_cores()) if vcpu not in offline]
+    cpulist = ",".join([str(vcpu) for vcpu in vcpus])
+    fallback = "\n".join([
+        f"python3 -c {shlex.quote(_JITTER_FALLBACK)} {vcpu} {interval} {duration} {max_us} &" for vcpu in vcpus
+    ] + ["wait"])
+    probe = "\n".join([
+        "if command -v cyclictest >/dev/null; then",
+        f"  cyclictest -q -m -p 95 -D {duration} -i {interval} -h {max_us} -t {len(vcpus)} -a {cpulist}",
+        "else",
+        fallback,
+        "fi",
+    ])
+    stdout, stderr = node.execute(
+        f"sudo systemd-run --scope -q -p AllowedCPUs={cpulist} -- bash -c {shlex.quote(probe)}", quiet=True)
+
+    hists = {vcpu: dict[int, int]() for vcpu in vcpus}
+    for line in stdout.splitlines():
+        if line.startswith("{"):
+            # Python fallback: one JSON object per VCPU.
+            result = json.loads(line)
+            hists[result["vcpu"]] = {bucket: count for bucket,
+                                     count in enumerate(result["hist"]) if count > 0}
+        elif len(line) > 0 and line[0].isdigit():
+            # cyclictest histogram: latency bucket followed by one column per thread.
+            bucket, *counts = [int(token) for token in line.split()]
+            for vcpu, count in zip(vcpus, counts):
+                if count > 0:
+                    hists[vcpu][bucket] = count
+
+    missing = [vcpu for vcpu, hist in hists.items() if len(hist) == 0]
+    if len(missing) > 0:
+        raise RuntimeError(
+            f"jitter probe on {node.get_name()} produced no samples for VCPU {missing}: {stderr.strip()}")
+
+    report = dict[int, dict]()
+    for vcpu, hist in hists.items():
+        report[vcpu] = {
+            "samples": sum(hist.values()),
+            "percentiles": {p: _percentile(hist, p) for p in percentiles},
+            "histogram": hist,
+        }
+        if not quiet:
+            print(f"VCPU {vcpu}: samples={report[vcpu]['samples']} " +
+                  " ".join([f"p{p}={us}us" for p, us in report[vcpu]["percentiles"].items()]))
+    return report
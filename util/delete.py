@@ -1,9 +1,59 @@
-import sys
+import argparse
+import fnmatch
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from fabrictestbed_extensions.fablib.fablib import \
     FablibManager as fablib_manager
+from fabrictestbed_extensions.fablib.slice import Slice
+
+parser = argparse.ArgumentParser(description='Delete slices.')
+parser.add_argument('patterns', metavar='SLICE-NAME', nargs='+',
+                    help='slice name or glob pattern, such as mtu@*')
+parser.add_argument('--regex', action='store_true',
+                    help='interpret patterns as regular expressions')
+parser.add_argument('--dry-run', action='store_true',
+                    help='list matching slices without deleting')
+parser.add_argument('--jobs', type=int, default=8,
+                    help='number of slices deleted concurrently')
+args = parser.parse_args()
 
 fablib = fablib_manager()
 
-slice_name = sys.argv[1]
-fablib.delete_slice(slice_name)
+
+def matches(slice_name: str) -> bool:
+    if args.regex:
+        return any(re.fullmatch(pattern, slice_name) for pattern in args.patterns)
+    return any(fnmatch.fnmatchcase(slice_name, pattern) for pattern in args.patterns)
+
+
+def delete(slice: Slice) -> float:
+    t0 = time.time()
+    slice.delete()
+    return time.time() - t0
+
+
+slices = [slice for slice in fablib.get_slices() if matches(slice.get_name())]
+if len(slices) == 0:
+    print('No matching slice')
+    exit(1)
+
+if args.dry_run:
+    for slice in slices:
+        print(f'{slice.get_name()} {slice.get_state()} {slice.get_lease_end()}')
+    exit()
+
+t0 = time.time()
+n_deleted = 0
+with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+    delete_threads = {executor.submit(delete, slice): slice.get_name()
+                      for slice in slices}
+    for i, thread in enumerate(as_completed(delete_threads)):
+        slice_name = delete_threads[thread]
+        try:
+            print(f'[{i+1}/{len(slices)}] {slice_name} DELETE {thread.result():.1f}s')
+            n_deleted += 1
+        except Exception as e:
+            print(f'[{i+1}/{len(slices)}] {slice_name} ERROR {e}')
+print(f'Deleted {n_deleted} of {len(slices)} slices in {time.time()-t0:.1f}s')
@@ -1,6 +1,14 @@
+import csv
+import itertools
+import json
+import os.path
 import re
 import shlex
-import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import (FIRST_COMPLETED, ThreadPoolExecutor,
+                                as_completed, wait)
 
 from fabrictestbed_extensions.fablib.fablib import \
     FablibManager as fablib_manager
@@ -18,8 +26,26 @@ SITES_ONLY = []
 SITES_AVOID = ['GATECH', 'SRI', 'LOSA', 'NEWY']
 # NIC model, 'NIC_Basic' or 'NIC_ConnectX_5' or 'NIC_ConnectX_6'
 NIC_MODEL = 'NIC_Basic'
-# MTUs to test
+# if True, binary-search exact path MTU within PROBE_MTU_RANGE; otherwise, test each size in PROBE_MTUS
+PROBE_BISECT = True
+# MTU search range in binary-search mode, upper bound should be the interface MTU
+PROBE_MTU_RANGE = (256, 9000)
+# MTUs to test if not binary-searching
 PROBE_MTUS = [256, 1280, 1420, 1500, 8900, 8948, 9000]
+# maximum concurrent probes involving each node, and in total
+PROBE_CONCURRENCY_NODE, PROBE_CONCURRENCY_TOTAL = 4, 32
+# file to persist probe results; results younger than RESULTS_TTL seconds are reused instead of probing again
+RESULTS_FILE, RESULTS_TTL = 'mtu.json', 86400
+# if non-empty, export the full matrix to these files, '*.json' or '*.csv'
+EXPORT_FILES = []
+# maximum concurrent slices being waited on and configured
+READY_WORKERS = 16
+# slice readiness polling interval, initial and maximum seconds; overall timeout in seconds
+READY_INTERVAL, READY_TIMEOUT = (5, 60), 1800
+# if True, measure iperf3 throughput between every pair of sites
+WANT_THROUGHPUT = False
+# iperf3 protocols 'tcp' and/or 'udp', test duration in seconds, UDP target bitrate
+THROUGHPUT_PROTOCOLS, THROUGHPUT_DURATION, THROUGHPUT_UDP_BITRATE = ['tcp', 'udp'], 10, '10G'
 
 # no need to change anything below
 
@@ -67,30 +93,41 @@ if WANT_CREATE:
         except Exception as e:
             print(e)
 
-failed_sites = []
+fabnet_subnets = {4: '10.128.0.0/10', 6: '2602:fcfb::/40'}
 addrs: dict[str, dict[int, str]] = {}
-for site, slice in slices.items():
+
+
+def wait_ready(slice: Slice) -> None:
+    """
+    Poll slice state with exponential backoff until it is stable.
+    """
+    interval, max_interval = READY_INTERVAL
+    deadline = time.time() + READY_TIMEOUT
+    while True:
+        slice.update()
+        state = slice.get_state()
+        if state in ['StableOK', 'ModifyOK']:
+            return
+        if state in ['StableError', 'ModifyError', 'Closing', 'Dead']:
+            raise RuntimeError(f'slice state {state}')
+        if time.time() + interval > deadline:
+            raise TimeoutError(f'slice state {state} after {READY_TIMEOUT}s')
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
+
+
+def bring_up(site: str, slice: Slice) -> None:
+    """
+    Wait for a slice to become ready, then apply IP configs on its node.
+    """
     if slice.get_state() not in ['StableOK', 'ModifyOK']:
-        try:
-            slice.wait()
-            slice.update()
-        except Exception as e:
-            print(f'Error in slice for site {site}')
-            print(e)
-            failed_sites.append(site)
-            continue
+        wait_ready(slice)
     node = slice.get_node('node')
     [ip4addr] = slice.get_l3network('net4').get_available_ips(count=1)
     [ip6addr] = slice.get_l3network('net6').get_available_ips(count=1)
     addrs[site] = {4: str(ip4addr), 6: str(ip6addr)}
     print(f'{site} is ready, mgmt {node.get_management_ip()}, IPv4 {ip4addr}, IPv6 {ip6addr}')
-for site in failed_sites:
-    del slices[site]
 
-print('Applying IP configs')
-execute_threads = {}
-for site, slice in slices.items():
-    node = slice.get_node('node')
     cmds: list[str] = []
     for af in [4, 6]:
         intf = node.get_interface(network_name=f'net{af}')
@@ -101,60 +138,320 @@ for site, slice in slices.items():
             f'sudo ip link set {shlex.quote(devname)} up',
             f'sudo ip link set {shlex.quote(devname)} mtu 9000',
             f'sudo ip -{af} addr flush dev {shlex.quote(devname)}',
-            f'sudo ip -{af} addr add {shlex.quote(addr)}/{net.get_subnet().prefixlen} dev {shlex.quote(devname)}'
+            f'sudo ip -{af} addr add {shlex.quote(addr)}/{net.get_subnet().prefixlen} dev {shlex.quote(devname)}',
+            f'sudo ip -{af} route replace {fabnet_subnets[af]} via {net.get_gateway()}',
         ]
-        for dst in slices:
-            if dst != site:
-                cmds.append(
-                    f'sudo ip -{af} route replace {addrs[dst][af]} via {net.get_gateway()}')
-    execute_threads[site] = node.execute_thread('\n'.join(cmds))
-for site, thread in execute_threads.items():
-    stdout, stderr = thread.result()
+    stdout, stderr = node.execute('\n'.join(cmds), quiet=True)
     if stderr != '':
         print(f'IP config for {site} error:\n{stderr}')
 
+
+print('Waiting for slices and applying IP configs')
+failed_sites = []
+with ThreadPoolExecutor(max_workers=READY_WORKERS) as executor:
+    bring_up_threads = {executor.submit(
+        bring_up, site, slice): site for site, slice in slices.items()}
+    for thread in as_completed(bring_up_threads):
+        site = bring_up_threads[thread]
+        try:
+            thread.result()
+        except Exception as e:
+            print(f'Error in slice for site {site}')
+            print(e)
+            failed_sites.append(site)
+for site in failed_sites:
+    del slices[site]
+    addrs.pop(site, None)
+
 re_loss = re.compile('([\d]+)% packet loss')
-re_rtt = re.compile('rtt.*([.\d]+)/([.\d]+)/([.\d]+)/[.\d]+ ms')
+re_rtt = re.compile('rtt [^=]*= ([.\d]+)/([.\d]+)/([.\d]+)/([.\d]+) ms')
+ping_overhead = {4: 28, 6: 48}
 width_mtu = 4
 width_rtt = 4
 width_td = width_mtu + width_rtt
 
 
-def process_ping_result(thread: threading.Thread) -> str:
+def ping_cmd(src: str, dst: str, af: int, mtu: int) -> str:
+    return f'ping -I {shlex.quote(addrs[src][af])} -c 4 -i 0.2 -W 0.8 -M do -s {mtu-ping_overhead[af]} {shlex.quote(addrs[dst][af])}'
+
+
+def run_pings(src: str, dst: str, af: int, mtus: list[int], *, strict=True) -> list[dict[str, float] | None]:
+    """
+    Ping from src to dst at each MTU.
+    Returns RTT min/avg/max/mdev of each MTU that passed, or None if it failed.
+    If strict, an MTU passes only without packet loss; otherwise, one reply is enough.
+    """
+    node = slices[src].get_node('node')
+    stdout, stderr = node.execute(
+        '\n'.join([ping_cmd(src, dst, af, mtu) for mtu in mtus]), quiet=True)
+    matches_loss = list(re_loss.finditer(stdout))
+    if len(matches_loss) != len(mtus):
+        raise ValueError('ping output mismatch')
+    ends = [m_loss.start() for m_loss in matches_loss[1:]] + [len(stdout)]
+    rtts: list[dict[str, float] | None] = []
+    for m_loss, end in zip(matches_loss, ends):
+        m_rtt = re_rtt.search(stdout, m_loss.end(), end)
+        if m_rtt is None or (strict and m_loss[1] != '0'):
+            rtts.append(None)
+            continue
+        rtts.append(dict(zip(['min', 'avg', 'max', 'mdev'],
+                    [float(x) for x in m_rtt.groups()])))
+    return rtts
+
+
+def probe_list(src: str, dst: str, af: int) -> tuple[int, dict[str, float] | None]:
+    """
+    Test each MTU in PROBE_MTUS.
+    Returns the largest passing MTU and RTT at that MTU.
+    """
+    pass_mtu, pass_rtt = 0, None
+    for mtu, rtt in zip(PROBE_MTUS, run_pings(src, dst, af, PROBE_MTUS)):
+        if rtt is not None:
+            pass_mtu, pass_rtt = mtu, rtt
+    return pass_mtu, pass_rtt
+
+
+def probe_bisect(src: str, dst: str, af: int) -> tuple[int, dict[str, float] | None]:
+    """
+    Binary-search exact path MTU within PROBE_MTU_RANGE.
+    Returns the largest passing MTU and RTT at that MTU.
+    """
+    lo, hi = PROBE_MTU_RANGE
+    # An oversized packet with DF flag is always lost, so that a size passes if any reply arrives;
+    # this prevents a random drop on a WAN path from steering the search downward.
+    # Most paths pass the interface MTU, which can be confirmed with a single probe.
+    [rtt] = run_pings(src, dst, af, [hi], strict=False)
+    if rtt is not None:
+        return hi, rtt
+    [pass_rtt] = run_pings(src, dst, af, [lo], strict=False)
+    if pass_rtt is None:
+        return 0, None
+    # Invariant: lo passes and hi fails.
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        [rtt] = run_pings(src, dst, af, [mid], strict=False)
+        if rtt is None:
+            hi = mid
+        else:
+            lo, pass_rtt = mid, rtt
+    return lo, pass_rtt
+
+
+def slice_ids(src: str, dst: str) -> list[str]:
+    return [slices[src].get_slice_id(), slices[dst].get_slice_id()]
+
+
+def probe(src: str, dst: str, af: int) -> dict:
+    """
+    Probe path MTU and RTT from src to dst.
+    Returns a result record to be saved in RESULTS_FILE.
+    """
+    record = {'src': src, 'dst': dst, 'af': af,
+              'time': time.time(), 'slices': slice_ids(src, dst)}
     try:
-        stdout, stderr = thread.result()
+        record['mtu'], record['rtt'] = (probe_bisect if PROBE_BISECT else probe_list)(
+            src, dst, af)
+    except ValueError:
+        record['error'] = 'ERR-RE'
     except:
-        return 'ERR-CMD'.ljust(width_td)
-    matches_loss = list(re_loss.finditer(stdout))
-    if len(matches_loss) != len(PROBE_MTUS):
-        return 'ERR-RE'.ljust(width_td)
-    pass_mtu = 0
-    for mtu, m_loss in zip(PROBE_MTUS, matches_loss):
-        if m_loss[1] == '0':
-            pass_mtu = mtu
-    max_avg_rtt = -1
-    for m_rtt in re_rtt.finditer(stdout):
-        max_avg_rtt = max(max_avg_rtt, float(m_rtt[2]))
-    return str(pass_mtu).ljust(width_mtu) + str(int(max_avg_rtt)).rjust(width_rtt)
-
-
-for af, overhead in {4: 28, 6: 48}.items():
+        record['error'] = 'ERR-CMD'
+    return record
+
+
+def format_record(record: dict) -> str:
+    if 'error' in record:
+        return record['error'].ljust(width_td)
+    rtt = -1 if record['rtt'] is None else record['rtt']['avg']
+    return str(record['mtu']).ljust(width_mtu) + str(int(rtt)).rjust(width_rtt)
+
+
+def schedule_probes(tasks: Iterable[tuple[str, str, int]]) -> Iterator[tuple[tuple[str, str, int], dict]]:
+    """
+    Run probes from all sources concurrently.
+    A probe counts toward the concurrency limit of both its source and destination node.
+    Yields each (src, dst, af) task and its result as soon as it completes.
+    """
+    pending = list(tasks)
+    running = {}
+    node_load = defaultdict(int)
+    with ThreadPoolExecutor(max_workers=PROBE_CONCURRENCY_TOTAL) as executor:
+        while len(pending) > 0 or len(running) > 0:
+            for task in pending[:]:
+                if len(running) >= PROBE_CONCURRENCY_TOTAL:
+                    break
+                endpoints = set(task[:2])
+                if any(node_load[site] >= PROBE_CONCURRENCY_NODE for site in endpoints):
+                    continue
+                pending.remove(task)
+                for site in endpoints:
+                    node_load[site] += 1
+                running[executor.submit(probe, *task)] = task
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                for site in set(task[:2]):
+                    node_load[site] -= 1
+                yield task, future.result()
+
+
+def record_key(src: str, dst: str, af: int) -> str:
+    return f'{src} {dst} {af}'
+
+
+def load_results() -> dict[str, dict]:
+    if not os.path.exists(RESULTS_FILE):
+        return {}
+    with open(RESULTS_FILE) as f:
+        return json.load(f)
+
+
+def save_results(results: dict[str, dict]) -> None:
+    with open(RESULTS_FILE, 'w') as f:
+        json.dump(results, f, indent=1)
+
+
+def is_fresh(record: dict | None, src: str, dst: str) -> bool:
+    """
+    Determine whether a saved result can be reused.
+    It must have no error, be younger than RESULTS_TTL, and come from the current slices.
+    """
+    return record is not None and 'error' not in record and \
+        time.time() - record['time'] < RESULTS_TTL and \
+        record['slices'] == slice_ids(src, dst)
+
+
+def export_results(records: list[dict], filename: str) -> None:
+    if filename.endswith('.csv'):
+        fields = ['src', 'dst', 'af', 'time', 'mtu', 'rtt_min',
+                  'rtt_avg', 'rtt_max', 'rtt_mdev', 'error']
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fields)
+            writer.writeheader()
+            for record in records:
+                row = {field: record.get(field, '') for field in fields}
+                for stat, value in (record.get('rtt', None) or {}).items():
+                    row[f'rtt_{stat}'] = value
+                writer.writerow(row)
+    else:
+        with open(filename, 'w') as f:
+            json.dump(records, f, indent=1)
+
+
+results = load_results()
+tasks = [(src, dst, af) for src, dst, af in itertools.product(slices, slices, ping_overhead)
+         if not is_fresh(results.get(record_key(src, dst, af), None), src, dst)]
+print(f'Probing MTU and RTT, {len(tasks)} stale or missing pairs')
+try:
+    for task, record in schedule_probes(tasks):
+        src, dst, af = task
+        print(f'{src} -> {dst} IPv{af}: {format_record(record).strip()}')
+        results[record_key(*task)] = record
+finally:
+    save_results(results)
+
+
+def print_table(title: str, cell: Callable[[str, str], str]) -> None:
     print('')
-    print(f'IPv{af} ping MTU and RTT')
+    print(title)
     print('src\\dst'.ljust(width_td), end='')
     for dst in slices:
         print(' | ' + dst.center(width_td), end='')
     print('')
     print('-'*(width_td+1) + ('|'+'-'*(width_td+2))*len(slices))
     for src in slices:
-        node = slices[src].get_node('node')
-        execute_threads = {}
-        for dst in slices:
-            execute_threads[dst] = node.execute_thread('\n'.join([
-                f'ping -I {shlex.quote(addrs[src][af])} -c 4 -i 0.2 -W 0.8 -M do -s {mtu-overhead} {shlex.quote(addrs[dst][af])}'
-                for mtu in PROBE_MTUS
-            ]))
         print(src.ljust(width_td), end='')
         for dst in slices:
-            print(' | ' + process_ping_result(execute_threads[dst]), end='')
+            print(' | ' + cell(src, dst), end='')
         print('')
+
+
+for af in ping_overhead:
+    print_table(f'IPv{af} ping MTU and RTT',
+                lambda src, dst: format_record(results[record_key(src, dst, af)]))
+
+records = [results[record_key(src, dst, af)]
+           for src, dst, af in itertools.product(slices, slices, ping_overhead)]
+for filename in EXPORT_FILES:
+    export_results(records, filename)
+    print(f'Exported to {filename}')
+
+if not WANT_THROUGHPUT:
+    exit()
+
+
+def tournament_rounds(sites: list[str]) -> Iterator[list[tuple[str, str]]]:
+    """
+    Arrange every ordered pair of distinct sites into rounds, using the circle method of round-robin tournament.
+    In each round, every site sends at most one flow and receives at most one flow.
+    """
+    ring: list[str | None] = list(sites)
+    if len(ring) % 2 == 1:
+        ring.append(None)
+    n = len(ring)
+    for _ in range(n - 1):
+        pairs = [(ring[i], ring[n-1-i]) for i in range(n // 2)]
+        pairs = [(a, b) for a, b in pairs if a is not None and b is not None]
+        yield pairs
+        yield [(b, a) for a, b in pairs]
+        ring = ring[:1] + ring[-1:] + ring[1:-1]
+
+
+def run_iperf(src: str, dst: str, af: int, protocol: str) -> float:
+    """
+    Run iperf3 from src to dst.
+    Returns receiver throughput in Gbps.
+    """
+    node = slices[src].get_node('node')
+    cmd = f'iperf3 -J -t {THROUGHPUT_DURATION} -B {shlex.quote(addrs[src][af])} -c {shlex.quote(addrs[dst][af])}'
+    if protocol == 'udp':
+        cmd += f' -u -b {shlex.quote(THROUGHPUT_UDP_BITRATE)}'
+    stdout, stderr = node.execute(cmd, quiet=True)
+    end = json.loads(stdout)['end']
+    if 'sum_received' in end:
+        return end['sum_received']['bits_per_second'] / 1e9
+    # older iperf3, such as 3.9 on Ubuntu 22.04, reports only the sender rate for UDP; receiver throughput is derived from loss
+    return end['sum']['bits_per_second'] * (1 - end['sum']['lost_percent'] / 100) / 1e9
+
+
+print('')
+print('Starting iperf3 servers')
+execute_threads = {}
+for site, slice in slices.items():
+    execute_threads[site] = slice.get_node('node').execute_thread('\n'.join([
+        'if ! command -v iperf3 >/dev/null; then',
+        '  sudo apt-get update -qq',
+        '  sudo DEBIAN_FRONTEND=noninteractive apt-get install -y -qq iperf3',
+        'fi',
+        'pkill -x iperf3 || true',
+        'iperf3 -s -D',
+    ]))
+for site, thread in execute_threads.items():
+    thread.result()
+
+throughputs: dict[tuple[str, str, int, str], float | None] = {}
+rounds = list(tournament_rounds(list(slices)))
+for af, protocol in itertools.product(ping_overhead, THROUGHPUT_PROTOCOLS):
+    for i, pairs in enumerate(rounds):
+        print(f'IPv{af} {protocol.upper()} throughput round {i+1}/{len(rounds)}')
+        with ThreadPoolExecutor(max_workers=max(1, len(pairs))) as executor:
+            iperf_threads = {(src, dst): executor.submit(
+                run_iperf, src, dst, af, protocol) for src, dst in pairs}
+        for (src, dst), thread in iperf_threads.items():
+            try:
+                throughputs[(src, dst, af, protocol)] = thread.result()
+            except:
+                throughputs[(src, dst, af, protocol)] = None
+
+
+def format_throughput(src: str, dst: str, af: int, protocol: str) -> str:
+    if src == dst:
+        return '-'.center(width_td)
+    gbps = throughputs[(src, dst, af, protocol)]
+    if gbps is None:
+        return 'ERR-CMD'.ljust(width_td)
+    return f'{gbps:.2f}'.rjust(width_td)
+
+
+for af, protocol in itertools.product(ping_overhead, THROUGHPUT_PROTOCOLS):
+    print_table(f'IPv{af} {protocol.upper()} throughput (Gbps)',
+                lambda src, dst: format_throughput(src, dst, af, protocol))
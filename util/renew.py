@@ -1,23 +1,129 @@
+import fnmatch
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
 from fabrictestbed_extensions.fablib.fablib import \
     FablibManager as fablib_manager
 
+# if True, keep running and renew slices matching SLICE_PATTERNS when their lease is about to end;
+# otherwise, renew slices in SLICE_NAMES once
+WANT_DAEMON = False
 # list of slice names
 SLICE_NAMES = [
     'demo@299792458',
     'demo@602214076',
 ]
+# number of slices renewed concurrently
+RENEW_WORKERS = 8
+# attempts per slice, and delay in seconds before first retry, doubled after each retry
+RENEW_ATTEMPTS, RENEW_RETRY_DELAY = 4, 30
+# in daemon mode, slice name glob patterns
+SLICE_PATTERNS = ['demo@*']
+# in daemon mode, renew a slice when its lease ends within this duration
+RENEW_HORIZON = timedelta(days=3)
+# in daemon mode, list slices again at this interval to discover new and deleted slices
+RELIST_INTERVAL = timedelta(hours=6)
 
 # no need to change anything below
 
 fablib = fablib_manager()
 
-for slice_name in SLICE_NAMES:
+
+def renew(slice_name: str) -> tuple[str, str, str]:
+    """
+    Renew a slice, retrying with exponential backoff.
+    Returns old lease end, new lease end, and status.
+    """
+    end0, delay = '', RENEW_RETRY_DELAY
+    for attempt in range(1, RENEW_ATTEMPTS+1):
+        try:
+            slice = fablib.get_slice(name=slice_name)
+            end0 = end0 or slice.get_lease_end()
+            slice.submit(lease_in_days=12, progress=False, wait=True,
+                         wait_ssh=False, post_boot_config=False)
+            end1 = slice.get_lease_end()
+            print(f"{slice_name} RENEW {end0} {end1}")
+            return end0, end1, 'RENEW' if attempt == 1 else f'RENEW after {attempt} attempts'
+        except Exception as e:
+            print(f"{slice_name} ERROR attempt {attempt}: {e}")
+            if attempt == RENEW_ATTEMPTS:
+                return end0, '', 'ERROR'
+            time.sleep(delay)
+            delay *= 2
+
+
+def parse_lease_end(lease_end: str | None) -> datetime:
     try:
-        slice = fablib.get_slice(name=slice_name)
-        end0 = slice.get_lease_end()
-        slice.submit(lease_in_days=12, progress=False, wait=True,
-                     wait_ssh=False, post_boot_config=False)
-        end1 = slice.get_lease_end()
-        print(f"{slice_name} RENEW {end0} {end1}")
-    except Exception as e:
-        print(f"{slice_name} ERROR {e}")
+        return datetime.strptime(lease_end, '%Y-%m-%d %H:%M:%S %z')
+    except (TypeError, ValueError):
+        # unknown lease end, renew as soon as possible
+        return datetime.now(timezone.utc)
+
+
+def list_lease_queue() -> list[tuple[datetime, str]]:
+    """
+    List slices matching SLICE_PATTERNS.
+    Returns a priority queue of (lease end, slice name).
+    """
+    queue = []
+    for slice in fablib.get_slices():
+        slice_name = slice.get_name()
+        if any(fnmatch.fnmatchcase(slice_name, pattern) for pattern in SLICE_PATTERNS):
+            queue.append((parse_lease_end(slice.get_lease_end()), slice_name))
+    heapq.heapify(queue)
+    return queue
+
+
+def run_daemon() -> None:
+    """
+    Renew slices only when their lease ends within RENEW_HORIZON.
+    """
+    relist_at = datetime.now(timezone.utc)
+    queue = []
+    with ThreadPoolExecutor(max_workers=RENEW_WORKERS) as executor:
+        while True:
+            now = datetime.now(timezone.utc)
+            if now >= relist_at:
+                relist_at = now + RELIST_INTERVAL
+                try:
+                    queue = list_lease_queue()
+                    print(f"{now} LIST {' '.join([slice_name for end, slice_name in sorted(queue)])}")
+                except Exception as e:
+                    # transient orchestrator error: keep the previous queue and retry at next listing
+                    print(f"{now} LIST ERROR {e}")
+
+            due = []
+            while len(queue) > 0 and queue[0][0] - RENEW_HORIZON <= now:
+                due.append(heapq.heappop(queue)[1])
+            renew_threads = {slice_name: executor.submit(
+                renew, slice_name) for slice_name in due}
+            for slice_name, thread in renew_threads.items():
+                end0, end1, status = thread.result()
+                # failed slice, or slice whose new lease still ends within horizon, is retried at next listing
+                end = parse_lease_end(end1)
+                if status != 'ERROR' and end - RENEW_HORIZON > now:
+                    heapq.heappush(queue, (end, slice_name))
+
+            wake_at = relist_at
+            if len(queue) > 0:
+                wake_at = min(wake_at, queue[0][0] - RENEW_HORIZON)
+            time.sleep(max(0, (wake_at - datetime.now(timezone.utc)).total_seconds()))
+
+
+if WANT_DAEMON:
+    run_daemon()
+    exit()
+
+with ThreadPoolExecutor(max_workers=RENEW_WORKERS) as executor:
+    renew_threads = {slice_name: executor.submit(
+        renew, slice_name) for slice_name in SLICE_NAMES}
+
+width_name = max([len('slice')] + [len(slice_name)
+                 for slice_name in SLICE_NAMES])
+print('')
+print(f"{'slice'.ljust(width_name)} | {'old lease end'.ljust(25)} | {'new lease end'.ljust(25)} | status")
+for slice_name, thread in renew_threads.items():
+    end0, end1, status = thread.result()
+    print(f"{slice_name.ljust(width_name)} | {str(end0).ljust(25)} | {str(end1).ljust(25)} | {status}")